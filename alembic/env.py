@@ -25,9 +25,19 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.models import SQLModel  # noqa: E402
+from app.search import SEARCH_TABLE_PREFIX  # noqa: E402
 
 target_metadata = SQLModel.metadata
 
+
+def include_name(name: str | None, type_: str, _parent_names: object) -> bool:
+    # The FTS5 tables and their shadow tables are created by hand in
+    # migrations, the models don't describe them
+    return not (
+        type_ == "table" and name is not None and name.startswith(SEARCH_TABLE_PREFIX)
+    )
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -62,6 +72,7 @@ def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_name=include_name,
         render_as_batch=True,
         user_module_prefix="sqlmodel.sql.sqltypes.",
     )
@@ -91,6 +102,11 @@ async def run_async_migrations() -> None:
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
 
+    # `app.core.db.migrate` passes the connection to upgrade
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
     asyncio.run(run_async_migrations())
 
 
@@ -0,0 +1,5 @@
+import uvicorn
+
+from app.core.config import config
+
+uvicorn.run("app.main:app", host=config.host, port=config.port, workers=config.workers)
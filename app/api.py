@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from app.routers import heroes, missions, teams
+from app.routers import changes, heroes, missions, search, teams
 
 api_router = APIRouter(prefix="/api")
 api_router.include_router(teams.router)
 api_router.include_router(heroes.router)
 api_router.include_router(missions.router)
+api_router.include_router(search.router)
+api_router.include_router(changes.router)
@@ -0,0 +1,14 @@
+import itertools
+from collections.abc import Iterator, Sequence
+from typing import Annotated
+
+from fastapi import Query
+
+from app.core.config import config
+
+ChunkSizeQuery = Annotated[int | None, Query(gt=0)]
+
+
+def chunks[T](items: Sequence[T], chunk_size: int | None) -> Iterator[tuple[T, ...]]:
+    """Splits a bulk payload into chunks of `chunk_size`, or the configured size."""
+    return itertools.batched(items, chunk_size or config.bulk_chunk_size, strict=False)
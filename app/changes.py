@@ -0,0 +1,236 @@
+"""The change feed: every write to a hero, team or mission, in commit order.
+
+Triggers on the entity tables and on `heromissionlink` record each create,
+update, delete and assignment as a `Change` row, in the transaction of the
+write itself, bulk statements included. So the outbox holds every committed
+write and never a rolled back one. SQLite commits one writer at a time, so
+changes commit in `seq` order, and a reader that has seen a `seq` has seen
+every change before it. As with `app.search`, only the Alembic migration
+creates the triggers.
+
+One `ChangeFeed` task per process tails the outbox and keeps the latest changes
+in memory, where every subscriber reads them. Another prunes the outbox down to
+the latest `changes_retention` changes.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import AbstractAsyncContextManager, suppress
+from dataclasses import dataclass
+from typing import Self
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import col, delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import config
+from app.models import Change, ChangePublic
+
+logger = logging.getLogger("app.changes")
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+
+@dataclass(frozen=True)
+class FeedEvent:
+    seq: int
+    # The change serialized once, however many subscribers it's sent to
+    data: bytes
+
+    @classmethod
+    def of(cls, change: Change) -> Self:
+        public = ChangePublic.model_validate(change)
+        return cls(public.seq, public.model_dump_json().encode())
+
+    def frame(self) -> bytes:
+        """The change as a Server-Sent Event, whose id resumes the stream."""
+        return b"id: %d\nevent: change\ndata: %s\n\n" % (self.seq, self.data)
+
+
+def json_list(events: Iterable[FeedEvent]) -> bytes:
+    return b"[" + b",".join(event.data for event in events) + b"]"
+
+
+class ChangeFeed:
+    """Tails the change outbox for every subscriber in the process.
+
+    One task polls the outbox every `interval`, or as soon as a write in this
+    process commits, and keeps the latest `buffer_size` changes. Long polls and
+    event streams wait on the feed instead of the database, so the outbox sees
+    one query per poll however many clients are subscribed.
+    """
+
+    def __init__(self, *, interval: float, buffer_size: int) -> None:
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.clear()
+
+    def clear(self) -> None:
+        self.polls = 0
+        # The last `seq` read, None until the first poll
+        self.last_seq: int | None = None
+        self.recent: deque[FeedEvent] = deque(maxlen=self.buffer_size)
+        self._arrived = asyncio.Event()
+        self._woken = asyncio.Event()
+
+    async def poll(self, session: AsyncSession) -> int:
+        """Reads the changes committed since the last poll, and wakes subscribers.
+
+        Returns how many it read, at most `buffer_size`.
+        """
+        self.polls += 1
+        if self.last_seq is None:
+            # Start from the latest changes, so that subscribers can resume
+            # across a restart
+            results = await session.exec(
+                select(Change).order_by(col(Change.seq).desc()).limit(self.buffer_size)
+            )
+            changes = list(reversed(results.all()))
+            self.last_seq = 0
+        else:
+            results = await session.exec(
+                select(Change)
+                .where(col(Change.seq) > self.last_seq)
+                .order_by(col(Change.seq))
+                .limit(self.buffer_size)
+            )
+            changes = results.all()
+        if not changes:
+            return 0
+        self.recent.extend(FeedEvent.of(change) for change in changes)
+        self.last_seq = self.recent[-1].seq
+        arrived, self._arrived = self._arrived, asyncio.Event()
+        arrived.set()
+        return len(changes)
+
+    async def run(self, engine: AsyncEngine) -> None:
+        while True:
+            self._woken.clear()
+            try:
+                async with AsyncSession(engine) as session:
+                    # A full page may have left more behind, read on right away
+                    behind = await self.poll(session) == self.buffer_size
+            except Exception:
+                logger.exception("Reading the change outbox failed")
+                behind = False
+            if not behind:
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(self.interval):
+                        await self._woken.wait()
+
+    def wake(self) -> None:
+        """Polls right away instead of at the next interval, after a commit."""
+        self._woken.set()
+
+    def after(self, since: int) -> list[FeedEvent] | None:
+        """The changes after `since`, None if they may not all be in memory."""
+        if self.last_seq is None:
+            return None
+        floor = self.recent[0].seq - 1 if self.recent else self.last_seq
+        if since < floor:
+            return None
+        # Subscribers are mostly near the end, so search from there
+        events: list[FeedEvent] = []
+        for feed_event in reversed(self.recent):
+            if feed_event.seq <= since:
+                break
+            events.append(feed_event)
+        events.reverse()
+        return events
+
+    async def wait(self, since: int, seconds: float) -> list[FeedEvent] | None:
+        """Like `after`, but waits up to `seconds` for a change to arrive."""
+        events = self.after(since)
+        if events is None or events:
+            return events
+        arrived = self._arrived
+        with suppress(TimeoutError):
+            async with asyncio.timeout(seconds):
+                await arrived.wait()
+        return self.after(since)
+
+
+change_feed = ChangeFeed(
+    interval=config.changes_poll_interval, buffer_size=config.changes_buffer_size
+)
+
+
+async def latest_seq(session: AsyncSession) -> int:
+    if change_feed.last_seq is not None:
+        return change_feed.last_seq
+    results = await session.exec(select(func.max(Change.seq)))
+    return results.one() or 0
+
+
+async def horizon(session: AsyncSession) -> int:
+    """The last `seq` pruned from the outbox, subscribers before it start over."""
+    results = await session.exec(select(func.min(Change.seq)))
+    oldest = results.one()
+    return oldest - 1 if oldest is not None else 0
+
+
+async def prune(session: AsyncSession, keep: int) -> int:
+    """Deletes all but the latest `keep` changes, returning how many it deleted."""
+    latest = select(func.max(Change.seq)).scalar_subquery()
+    result = await session.exec(delete(Change).where(col(Change.seq) <= latest - keep))
+    await session.commit()
+    return result.rowcount
+
+
+async def run_retention(
+    write_session: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+    *,
+    keep: int,
+    interval: float,
+) -> None:
+    """Prunes the outbox every `interval`, through sessions from `write_session`."""
+    while True:
+        try:
+            async with write_session() as session:
+                pruned = await prune(session, keep)
+            if pruned:
+                logger.info("Pruned %d changes from the outbox", pruned)
+        except Exception:
+            logger.exception("Pruning the change outbox failed")
+        await asyncio.sleep(interval)
+
+
+async def read(session: AsyncSession, since: int, limit: int) -> list[FeedEvent]:
+    """The first `limit` changes after `since`, from the outbox itself."""
+    results = await session.exec(
+        select(Change)
+        .where(col(Change.seq) > since)
+        .order_by(col(Change.seq))
+        .limit(limit)
+    )
+    return [FeedEvent.of(change) for change in results]
+
+
+async def stream(
+    since: int, backlog: list[FeedEvent], seconds: float
+) -> AsyncIterator[bytes]:
+    """Server-Sent Events for `backlog`, then for each change after it.
+
+    Ends after `seconds`, or once the subscriber has fallen behind what
+    the feed keeps in memory. EventSource clients reconnect on their own, and
+    resume from the last event id they got.
+    """
+    for feed_event in backlog:
+        yield feed_event.frame()
+        since = feed_event.seq
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while (remaining := deadline - loop.time()) > 0:
+        events = await change_feed.wait(
+            since, min(remaining, config.changes_heartbeat_seconds)
+        )
+        if events is None:
+            return
+        if not events:
+            # Keeps proxies from closing an idle stream
+            yield b": keep-alive\n\n"
+        for feed_event in events:
+            yield feed_event.frame()
+            since = feed_event.seq
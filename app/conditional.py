@@ -0,0 +1,158 @@
+import hashlib
+import uuid
+from collections.abc import Iterable
+from typing import Annotated, NamedTuple
+
+from fastapi import Header, HTTPException, Response, status
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import CacheEntry
+from app.core.compression import choose, decoded_etag, encoded_etag
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+# Conditional requests. The ETag of a detail response is a digest of the
+# `version` of its row and of every row embedded in it, so it can be checked
+# from version columns alone, without loading the response.
+
+IfNoneMatchHeader = Annotated[str | None, Header()]
+IfMatchHeader = Annotated[str | None, Header()]
+
+
+class Current(NamedTuple):
+    """The version of a row, and the ETag of its detail response."""
+
+    version: int
+    etag: str
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def versions(
+    rows: Iterable[tuple[uuid.UUID | None, int | None]],
+) -> list[tuple[uuid.UUID, int | None]]:
+    return sorted((id, version) for id, version in rows if id is not None)
+
+
+def matches(header: str, etag: str, *, weak: bool = False) -> bool:
+    """Whether an If-Match or If-None-Match header lists `etag`, or is `*`.
+
+    The ETags of compressed representations match the resource's own.
+    """
+    tags = {tag.strip() for tag in header.split(",")}
+    if weak:
+        tags = {tag.removeprefix("W/") for tag in tags}
+    return "*" in tags or etag in {decoded_etag(tag) for tag in tags}
+
+
+def not_modified(etag: str, if_none_match: str) -> Response:
+    """Answers 304 with the ETag the client holds, in whichever coding it has."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if decoded_etag(tag) == etag:
+            etag = tag
+            break
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def respond(entry: CacheEntry, if_none_match: str | None) -> Response:
+    """Answers 304 when the client already holds the entry, or sends it.
+
+    The content goes out in the encoding negotiated for the request, compressed
+    once per entry rather than once per response.
+    """
+    if if_none_match is not None and matches(if_none_match, entry.etag, weak=True):
+        return not_modified(entry.etag, if_none_match)
+    headers = {"ETag": entry.etag}
+    content = entry.content
+    if encoding := choose(len(content)):
+        content = entry.encode(encoding)
+        headers = {
+            "ETag": encoded_etag(entry.etag, encoding),
+            "Content-Encoding": encoding,
+            "Vary": "Accept-Encoding",
+        }
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def check_if_match(if_match: str, current: Current) -> None:
+    if not matches(if_match, current.etag):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="ETag does not match",
+        )
+
+
+def hero_etag(hero: Hero) -> str:
+    """ETag of a `HeroPublicWithTeamMissions` response, from the loaded hero."""
+    return make_etag(
+        hero.version,
+        hero.team.version if hero.team else None,
+        versions((mission.id, mission.version) for mission in hero.missions),
+    )
+
+
+def team_etag(team: Team) -> str:
+    """ETag of a `TeamPublicWithHeroes` response, from the loaded team."""
+    return make_etag(
+        team.version, versions((hero.id, hero.version) for hero in team.heroes)
+    )
+
+
+def mission_etag(mission: Mission) -> str:
+    """ETag of a `MissionPublicWithHeroes` response, from the loaded mission."""
+    return make_etag(
+        mission.version, versions((hero.id, hero.version) for hero in mission.heroes)
+    )
+
+
+async def current_hero(session: AsyncSession, hero_id: uuid.UUID) -> Current | None:
+    results = await session.exec(
+        select(Hero.version, Team.version, Mission.id, Mission.version)
+        .outerjoin(Team, col(Hero.team_id) == Team.id)
+        .outerjoin(HeroMissionLink, col(HeroMissionLink.hero_id) == Hero.id)
+        .outerjoin(Mission, col(HeroMissionLink.mission_id) == Mission.id)
+        .where(col(Hero.id) == hero_id)
+    )
+    rows = results.all()
+    if not rows:
+        return None
+    version, team_version, _, _ = rows[0]
+    missions = versions(
+        (mission_id, mission_version) for *_, mission_id, mission_version in rows
+    )
+    return Current(version, make_etag(version, team_version, missions))
+
+
+async def current_team(session: AsyncSession, team_id: uuid.UUID) -> Current | None:
+    results = await session.exec(
+        select(Team.version, Hero.id, Hero.version)
+        .outerjoin(Hero, col(Hero.team_id) == Team.id)
+        .where(col(Team.id) == team_id)
+    )
+    rows = results.all()
+    if not rows:
+        return None
+    version = rows[0][0]
+    heroes = versions((hero_id, hero_version) for _, hero_id, hero_version in rows)
+    return Current(version, make_etag(version, heroes))
+
+
+async def current_mission(
+    session: AsyncSession, mission_id: uuid.UUID
+) -> Current | None:
+    results = await session.exec(
+        select(Mission.version, Hero.id, Hero.version)
+        .outerjoin(HeroMissionLink, col(HeroMissionLink.mission_id) == Mission.id)
+        .outerjoin(Hero, col(HeroMissionLink.hero_id) == Hero.id)
+        .where(col(Mission.id) == mission_id)
+    )
+    rows = results.all()
+    if not rows:
+        return None
+    version = rows[0][0]
+    heroes = versions((hero_id, hero_version) for _, hero_id, hero_version in rows)
+    return Current(version, make_etag(version, heroes))
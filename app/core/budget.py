@@ -0,0 +1,134 @@
+import logging
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import Depends
+from sqlalchemy import Connection, event
+from sqlalchemy.engine.interfaces import DBAPICursor, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import config
+
+logger = logging.getLogger("app.sql")
+
+# Transaction control depends on how the session was set up (the writer's
+# SAVEPOINTs, connection pragmas), not on what the route queries
+UNBUDGETED = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class Queries:
+    """The statements run for one request, or block, and the limits they're held to."""
+
+    statements: list[str] = field(default_factory=list)
+    budget: int | None = None
+    repeat_limit: int | None = None
+
+    def violations(self) -> list[str]:
+        problems = []
+        if self.budget is not None and len(self.statements) > self.budget:
+            problems.append(
+                f"{len(self.statements)} statements, over the budget of {self.budget}"
+            )
+        if self.repeat_limit is not None:
+            problems.extend(
+                f"{count} identical statements, likely an N+1: {statement}"
+                for statement, count in Counter(self.statements).items()
+                if count > self.repeat_limit
+            )
+        return problems
+
+
+current: ContextVar[Queries | None] = ContextVar("queries", default=None)
+
+
+def query_budget(statements: int | None = None, *, chunked: bool = False) -> Any:  # noqa: ANN401
+    """Declares a route's query budget, for `dependencies=[...]` on the endpoint.
+
+    `chunked` routes repeat their statements once per chunk of the payload by
+    design, so they aren't checked for repeats.
+    """
+
+    async def declare() -> None:
+        if queries := current.get():
+            queries.budget = statements
+            if chunked:
+                queries.repeat_limit = None
+
+    return Depends(declare)
+
+
+class QueryBudgetMiddleware:
+    """Checks the statements each request ran against its route's budget.
+
+    Also flags statements repeated more than `query_budget_repeat_limit` times,
+    declared budget or not. Violations are logged, or raised, depending on
+    `query_budget_mode`; it does nothing when that's "off".
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or config.query_budget_mode == "off":
+            await self.app(scope, receive, send)
+            return
+        queries = Queries(repeat_limit=config.query_budget_repeat_limit)
+        token = current.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current.reset(token)
+        if problems := queries.violations():
+            route = getattr(scope.get("route"), "path", scope["path"])
+            message = f"{scope['method']} {route}: {'; '.join(problems)}"
+            if config.query_budget_mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded by %s", message)
+
+
+@contextmanager
+def track(
+    budget: int | None = None, *, repeats: int | None = None
+) -> Iterator[Queries]:
+    """Raises `QueryBudgetExceeded` if the block runs more than `budget` statements.
+
+    Or repeats one more than `repeats` times. Only statements run on
+    instrumented engines are seen.
+    """
+    queries = Queries(budget=budget, repeat_limit=repeats)
+    token = current.set(queries)
+    try:
+        yield queries
+    finally:
+        current.reset(token)
+    if problems := queries.violations():
+        raise QueryBudgetExceeded("; ".join(problems))
+
+
+def instrument(engine: AsyncEngine) -> None:
+    """Records the statements `engine` runs against the current query budget."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(
+        _connection: Connection,
+        _cursor: DBAPICursor,
+        statement: str,
+        _parameters: Any,  # noqa: ANN401
+        _context: ExecutionContext | None,
+        _executemany: bool,
+    ) -> None:
+        queries = current.get()
+        if queries is not None and not statement.lstrip().upper().startswith(
+            UNBUDGETED
+        ):
+            queries.statements.append(statement)
@@ -0,0 +1,211 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import compression
+from app.core.config import config
+
+type CacheKey = tuple[str, uuid.UUID]
+
+
+@dataclass
+class CacheEntry:
+    content: bytes
+    expires: float
+    etag: str
+    tags: frozenset[CacheKey] = field(default_factory=frozenset)
+    # The content in each encoding it's been sent in so far
+    compressed: dict[str, bytes] = field(default_factory=dict)
+
+    def encode(self, encoding: str) -> bytes:
+        """The content compressed in `encoding`, compressing it only the first time."""
+        if (content := self.compressed.get(encoding)) is None:
+            content = compression.compress(self.content, encoding)
+            self.compressed[encoding] = content
+        return content
+
+
+class ResponseCache:
+    """Bounded LRU cache, with a TTL, of serialized responses by entity key.
+
+    An entry can be tagged with the keys of the entities embedded in it, so
+    invalidating an entity also drops every cached response that embeds it.
+    """
+
+    def __init__(self, *, enabled: bool, max_entries: int, ttl: float) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._tagged: dict[CacheKey, set[CacheKey]] = {}
+        self._invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> CacheEntry | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def token(self) -> int:
+        """Marks the start of a load; pass it to `set` to detect racing writes."""
+        return self._invalidations
+
+    def set(
+        self,
+        key: CacheKey,
+        content: bytes,
+        *,
+        etag: str,
+        tags: Iterable[CacheKey] = (),
+        token: int | None = None,
+    ) -> CacheEntry:
+        """Caches `content`, and returns its entry whether it was cached or not."""
+        entry = CacheEntry(
+            content, time.monotonic() + self.ttl, etag=etag, tags=frozenset(tags)
+        )
+        # A write invalidated something while this response was being loaded,
+        # so it may already be stale
+        if not self.enabled or (token is not None and token != self._invalidations):
+            return entry
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, *keys: CacheKey) -> None:
+        """Drops the entries for `keys` and every entry tagged with one of them."""
+        self._invalidations += 1
+        for key in keys:
+            self._remove(key)
+            for tagged in self._tagged.pop(key, set()):
+                self._remove(tagged)
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        self._entries.clear()
+        self._tagged.clear()
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            if tagged := self._tagged.get(tag):
+                tagged.discard(key)
+                if not tagged:
+                    del self._tagged[tag]
+
+
+response_cache = ResponseCache(
+    # Each worker process would hold its own copy, which writes handled by the
+    # other workers can't invalidate. Only `python -m app` tells us how many there
+    # are, which is why the cache is also opt-in
+    enabled=config.cache_enabled and config.workers == 1,
+    max_entries=config.cache_max_entries,
+    ttl=config.cache_ttl_seconds,
+)
+
+# Aggregates depend on every row, so rather than being invalidated by writes
+# they expire after a short TTL. Keyed by name, with the nil UUID.
+stats_cache = ResponseCache(
+    enabled=config.stats_cache_ttl_seconds > 0,
+    max_entries=16,
+    ttl=config.stats_cache_ttl_seconds,
+)
+STATS_ID = uuid.UUID(int=0)
+
+
+@dataclass
+class Flight:
+    result: asyncio.Future[CacheEntry]
+    token: int
+
+
+class SingleFlight:
+    """Lets concurrent identical reads share one in-flight load of a response.
+
+    The first request for a key runs the load; requests for the same key that
+    arrive while it's running wait for its entry instead of running their own
+    queries, and share its compressed bodies too. A request only joins a load
+    that started after the last cache invalidation, compared by
+    `ResponseCache.token`, so a response loaded before a write is never handed
+    to a request that arrived after it.
+    """
+
+    def __init__(self, *, enabled: bool) -> None:
+        self.enabled = enabled
+        # Loads saved by joining another request's
+        self.coalesced = 0
+        self._flights: dict[CacheKey, Flight] = {}
+
+    async def run(
+        self,
+        key: CacheKey,
+        token: int,
+        load: Callable[[], Awaitable[CacheEntry]],
+    ) -> CacheEntry:
+        """The entry that `load` returns, or that a shared load did."""
+        if not self.enabled:
+            return await load()
+        while (flight := self._flights.get(key)) and flight.token == token:
+            self.coalesced += 1
+            # Waits without cancelling the shared load if this request goes away
+            await asyncio.wait([flight.result])
+            if not flight.result.cancelled():
+                return flight.result.result()
+            # The leading request was cancelled, so this one loads instead
+            self.coalesced -= 1
+        flight = Flight(asyncio.get_running_loop().create_future(), token)
+        self._flights[key] = flight
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            flight.result.cancel()
+            raise
+        except Exception as error:
+            flight.result.set_exception(error)
+            # Marked retrieved, the waiters re-raise it if there are any
+            flight.result.exception()
+            raise
+        else:
+            flight.result.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+single_flight = SingleFlight(enabled=config.coalesce_reads)
+
+
+def invalidate(session: AsyncSession, *keys: CacheKey) -> None:
+    """Invalidates `keys` now, and again once the write session is committed.
+
+    The second pass drops anything a concurrent read cached between the route's
+    commit and the writer's group commit making it durable.
+    """
+    response_cache.invalidate(*keys)
+    session.info.setdefault("cache_invalidations", set()).update(keys)
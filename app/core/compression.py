@@ -0,0 +1,219 @@
+import zlib
+from compression import zstd
+from contextvars import ContextVar
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import config
+
+try:
+    import brotli
+except ImportError:  # Optional, brotli is only offered when it's installed
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        """Compresses `data` and flushes it, so a client can decode it already."""
+        ...
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compresses the last of the data and ends the stream."""
+        ...
+
+
+# Levels are the ones meant for compressing on the fly, cheap enough per response
+class GzipEncoder:
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class ZstdEncoder:
+    def __init__(self) -> None:
+        self._compressor = zstd.ZstdCompressor(level=3)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data, zstd.ZstdCompressor.FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data, zstd.ZstdCompressor.FLUSH_FRAME)
+
+
+class BrotliEncoder:
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+# In order of preference, for clients that accept more than one equally
+ENCODERS: dict[str, type[Encoder]] = {"zstd": ZstdEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+# The encoding negotiated for the current request, None to send it as is
+accepted: ContextVar[str | None] = ContextVar("accepted_encoding", default=None)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """The encoding to send a response in, given an Accept-Encoding header.
+
+    The one with the highest q-value, ties going to the first in `ENCODERS`.
+    None when the client accepts none of them.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = (piece.strip() for piece in part.split(";"))
+        weight = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    weight = float(param[2:])
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    best = max(
+        ENCODERS, key=lambda encoding: weights.get(encoding, wildcard), default=None
+    )
+    if best is None or weights.get(best, wildcard) <= 0:
+        return None
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of the `encoding` coded representation, a validator of its own."""
+    return f'{etag.removesuffix('"')}-{encoding}"'
+
+
+def decoded_etag(etag: str) -> str:
+    """The ETag of the resource a possibly coded representation's ETag is of."""
+    for encoding in ENCODERS:
+        if etag.endswith(suffix := f'-{encoding}"'):
+            return etag.removesuffix(suffix) + '"'
+    return etag
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return ENCODERS[encoding]().finish(content)
+
+
+def choose(size: int) -> str | None:
+    """The encoding to send `size` bytes of the current response in, if any."""
+    if size < config.compression_min_size:
+        return None
+    return accepted.get()
+
+
+def compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        # Events go out as they happen, buffering them would hold them back
+        and not content_type.startswith("text/event-stream")
+    )
+
+
+class CompressionMiddleware:
+    """Compresses responses in the encoding the client prefers.
+
+    Responses of at least `compression_min_size` bytes are compressed whole, and
+    streaming ones chunk by chunk once that many bytes have been produced, each
+    chunk flushed so the client can decode it as it arrives. Responses that are
+    already encoded, like the precompressed cached ones, go out as they are.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        token = accepted.set(encoding)
+        try:
+            await self.app(scope, receive, Compressor(send, encoding).send)
+        finally:
+            accepted.reset(token)
+
+
+class Compressor:
+    """Sends one response, compressing its body if it's worth it."""
+
+    def __init__(self, send: Send, encoding: str | None) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.encoder_type = ENCODERS[encoding] if encoding else None
+        self.start: Message | None = None
+        self.buffer = b""
+        self.encoder: Encoder | None = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if not compressible(headers):
+                await self._send(message)
+                return
+            # The body depends on the request's Accept-Encoding, whatever it is
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoder_type is None:
+                await self._send(message)
+            else:
+                self.start = message
+            return
+        if (
+            message["type"] != "http.response.body"
+            or self.start is None
+            or self.encoder_type is None
+        ):
+            await self._send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is not None:
+            body = (
+                self.encoder.compress(body) if more_body else self.encoder.finish(body)
+            )
+            await self._send({**message, "body": body})
+            return
+        self.buffer += body
+        if more_body and len(self.buffer) < config.compression_min_size:
+            return
+        body, self.buffer = self.buffer, b""
+        headers = MutableHeaders(raw=self.start["headers"])
+        if len(body) < config.compression_min_size:
+            await self._send(self.start)
+            await self._send({**message, "body": body})
+            return
+        self.encoder = self.encoder_type()
+        headers["Content-Encoding"] = str(self.encoding)
+        if etag := headers.get("etag"):
+            headers["ETag"] = encoded_etag(etag, str(self.encoding))
+        if more_body:
+            del headers["Content-Length"]
+            body = self.encoder.compress(body)
+        else:
+            body = self.encoder.finish(body)
+            headers["Content-Length"] = str(len(body))
+        await self._send(self.start)
+        await self._send({**message, "body": body})
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import AnyUrl, BeforeValidator, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -21,7 +21,72 @@ class Settings(BaseSettings):
     )
 
     database_url: str
+    # Server processes for `python -m app`, each with its own engines
+    workers: int = 1
+    host: str = "127.0.0.1"
+    port: int = 8000
     cors_origins: Annotated[list[AnyUrl] | str, BeforeValidator(parse_cors)] = []
+    bulk_chunk_size: int = 500
+    export_batch_size: int = 1000
+    # Serialize list pages straight from rows, skipping response_model
+    fast_responses: bool = False
+
+    # In-process cache of single-entity GET responses. Only turn it on when the
+    # app is served by a single process: a process can't invalidate the copies
+    # held by the others, which `uvicorn --workers` or gunicorn would start
+    cache_enabled: bool = False
+    cache_max_entries: int = 10_000
+    cache_ttl_seconds: float = 60.0
+    # Concurrent requests for the same entity share one database load
+    coalesce_reads: bool = True
+    # Aggregate /stats responses are reused for this long, 0 recomputes each time
+    stats_cache_ttl_seconds: float = 5.0
+    # Responses are compressed with zstd, brotli (if installed) or gzip, as the
+    # client prefers, once they're at least this many bytes
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    # The change feed reads the outbox this often, and right after local writes,
+    # keeping this many of the latest changes in memory for its subscribers
+    changes_poll_interval: float = 1.0
+    changes_buffer_size: int = 10_000
+    # Idle event streams get a comment this often, so proxies keep them open
+    changes_heartbeat_seconds: float = 15.0
+    # The outbox keeps the latest this many changes, pruned this often, and 0
+    # keeps every one. Subscribers further behind have to start over.
+    changes_retention: int = 1_000_000
+    changes_prune_interval: float = 300.0
+
+    # Development check of statements per request against the routes' declared
+    # query budgets, also flagging any statement repeated past the limit (N+1)
+    query_budget_mode: Literal["off", "warn", "raise"] = "off"
+    query_budget_repeat_limit: int = 3
+
+    # Engine profile, pool settings apply to every backend
+    db_echo: bool = False
+    # Log statements that take at least this long, in milliseconds
+    slow_query_ms: float | None = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    # Most SQLite writes one commit may cover, see `SerialWriter`
+    db_write_group_size: int = 64
+    # Open the pools' connections at startup, and prepare the hot statements on
+    # each of them
+    db_warm_pool: bool = True
+    db_prepare_statements: bool = True
+    # Seconds between the `SELECT 1` checks behind /health/ready, and how long
+    # one may take, pool wait included
+    health_check_interval: float = 5.0
+    health_check_timeout: float = 2.0
+
+    # Pragmas run on every new SQLite connection, ignored for other backends
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_busy_timeout: int = 5000  # milliseconds
+    sqlite_cache_size: int = -64000  # negative values are KiB, so 64 MiB
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # bytes
+    sqlite_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
 
     @computed_field
     @property
@@ -1,9 +1,165 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any
 
-from app.core.config import config
+from alembic.command import upgrade
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import Connection, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-engine = create_async_engine(
-    config.database_url,
-    connect_args={"check_same_thread": False},
-    echo=True,
-)
+from app.core import budget, metrics
+from app.core.config import Settings, config
+from app.core.writer import SerialWriter
+
+MIGRATIONS = Path(__file__).parents[2] / "alembic"
+
+
+def migrate(connection: Connection) -> None:
+    """Upgrades the database on `connection` to the latest migration.
+
+    The migrations are the only definition of the FTS5 tables and the triggers,
+    which the models don't describe, so databases built outside of Alembic's
+    command line, like the tests', go through them instead of `create_all`.
+    """
+    alembic_config = AlembicConfig()
+    alembic_config.set_main_option("script_location", str(MIGRATIONS))
+    alembic_config.attributes["connection"] = connection
+    upgrade(alembic_config, "head")
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def sqlite_pragmas(settings: Settings) -> dict[str, str | int]:
+    # busy_timeout goes first, so that switching the journal mode waits out
+    # other processes' locks instead of failing
+    return {
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def build_engine(
+    settings: Settings, *, read_only: bool = False, single_writer: bool = False
+) -> AsyncEngine:
+    """Creates the async engine for `settings.database_url` with its tuning profile.
+
+    On SQLite, `read_only` engines refuse writes (`PRAGMA query_only`), and a
+    `single_writer` engine holds one connection that starts its transactions
+    with `BEGIN IMMEDIATE` so SAVEPOINTs work and the write lock is taken
+    up front.
+    """
+    url = make_url(settings.database_url)
+    sqlite = url.get_backend_name() == "sqlite"
+    kwargs: dict[str, Any] = {"echo": settings.db_echo}
+    if sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not (sqlite and is_sqlite_memory(url)):
+        # In-memory SQLite runs on a single static connection, so no pool sizing
+        kwargs |= {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+        }
+        if url.get_dialect().is_async:
+            kwargs["poolclass"] = metrics.InstrumentedPool
+    if sqlite and single_writer:
+        kwargs |= {"pool_size": 1, "max_overflow": 0}
+    engine = create_async_engine(url, **kwargs)
+    metrics.instrument(engine)
+    budget.instrument(engine)
+
+    if sqlite:
+        pragmas = sqlite_pragmas(settings)
+        if read_only:
+            pragmas["query_only"] = "ON"
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragmas(
+            dbapi_connection: DBAPIConnection, _connection_record: ConnectionPoolEntry
+        ) -> None:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+            if single_writer:
+                # Let SQLAlchemy, not the driver, decide when transactions begin
+                dbapi_connection.isolation_level = None
+
+        if single_writer:
+
+            @event.listens_for(engine.sync_engine, "begin")
+            def begin_immediate(connection: Connection) -> None:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+# This process's engines, created by `connect` when the app starts up
+read_engine: AsyncEngine
+write_engine: AsyncEngine
+writer: SerialWriter | None = None
+
+
+def connect(settings: Settings = config) -> None:
+    """Creates this process's engines for `settings.database_url`.
+
+    Called from the app's lifespan rather than at import, so that every worker
+    process builds its own engines and never shares pooled connections.
+    """
+    global read_engine, write_engine, writer
+    url = make_url(settings.database_url)
+    if url.get_backend_name() == "sqlite" and not is_sqlite_memory(url):
+        # SQLite allows one writer at a time: reads get their own read-only pool
+        # and writes are serialized on a single connection, so they queue
+        # in-process instead of failing with "database is locked". Across worker
+        # processes, `BEGIN IMMEDIATE` waits up to `sqlite_busy_timeout` for the
+        # write lock, while WAL lets every worker's readers run alongside.
+        read_engine = build_engine(settings, read_only=True)
+        write_engine = build_engine(settings, single_writer=True)
+        writer = SerialWriter(write_engine, max_group_size=settings.db_write_group_size)
+    else:
+        read_engine = write_engine = build_engine(settings)
+        writer = None
+
+
+async def warm(
+    prepare: Callable[[AsyncSession], Awaitable[object]] | None = None,
+) -> None:
+    """Opens every pooled connection up front, running `prepare` on each.
+
+    `prepare` should run the hot statements, so they are compiled into the
+    engine's cache and prepared in each connection's statement cache before the
+    first requests need them.
+    """
+    # The writer goes first: it switches the database to WAL mode under the
+    # write lock, so the read-only connections that follow never need to
+    engines = (
+        [write_engine] if read_engine is write_engine else [write_engine, read_engine]
+    )
+    for engine in engines:
+        size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+        async with AsyncExitStack() as stack:
+            for _ in range(size):
+                connection = await stack.enter_async_context(engine.connect())
+                if prepare is not None:
+                    async with AsyncSession(connection) as session:
+                        await prepare(session)
+
+
+async def disconnect() -> None:
+    if writer is not None:
+        await writer.close()
+    await read_engine.dispose()
+    await write_engine.dispose()
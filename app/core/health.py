@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import config
+
+logger = logging.getLogger("app.health")
+
+
+@dataclass
+class Check:
+    ok: bool
+    checked_at: float
+    latency_ms: float | None = None
+    error: str | None = None
+
+
+class ReadinessProbe:
+    """Checks the database with `SELECT 1` on a timer, for readiness probes to read.
+
+    Probes only read the last result, so however often they come, the database
+    sees one check per `interval` and no probe waits on the pool.
+    """
+
+    def __init__(self, *, interval: float, timeout: float) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.last: Check | None = None
+
+    async def check(self, engine: AsyncEngine) -> Check:
+        started = time.perf_counter()
+        try:
+            # Waiting on an exhausted pool counts against the timeout too
+            async with asyncio.timeout(self.timeout), engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        except Exception as e:
+            error = "timed out" if isinstance(e, TimeoutError) else str(e)
+            self.last = Check(ok=False, checked_at=time.time(), error=error)
+        else:
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.last = Check(ok=True, checked_at=time.time(), latency_ms=latency_ms)
+        return self.last
+
+    async def run(self, engine: AsyncEngine) -> None:
+        while True:
+            check = await self.check(engine)
+            if not check.ok:
+                logger.warning("Database readiness check failed: %s", check.error)
+            await asyncio.sleep(self.interval)
+
+    def is_ready(self) -> bool:
+        # A stalled check loop shouldn't keep reporting its last success
+        return (
+            self.last is not None
+            and self.last.ok
+            and time.time() - self.last.checked_at <= 3 * self.interval + self.timeout
+        )
+
+
+def pool_usage(engine: AsyncEngine, max_overflow: int) -> tuple[int, int] | None:
+    """Connections checked out of `engine`'s pool, and how many it can hand out.
+
+    `max_overflow` is the one the engine was built with, which pools don't expose.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return pool.checkedout(), pool.size() + max(max_overflow, 0)
+
+
+readiness = ReadinessProbe(
+    interval=config.health_check_interval, timeout=config.health_check_timeout
+)
@@ -0,0 +1,218 @@
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Connection, CursorResult, Result, event
+from sqlalchemy.engine.interfaces import DBAPICursor, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import config
+
+logger = logging.getLogger("app.sql")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+type Labels = tuple[str, str, str]
+
+
+@dataclass
+class RequestStats:
+    """What one request spent on the database, filled in by the engine hooks."""
+
+    statements: int = 0
+    sql_seconds: float = 0.0
+    rows: int = 0
+    pool_wait_seconds: float = 0.0
+
+
+@dataclass
+class RouteMetrics:
+    buckets: list[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    count: int = 0
+    seconds: float = 0.0
+    db: RequestStats = field(default_factory=RequestStats)
+
+
+current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+routes: defaultdict[Labels, RouteMetrics] = defaultdict(RouteMetrics)
+
+
+def observe(labels: Labels, seconds: float, stats: RequestStats) -> None:
+    metrics = routes[labels]
+    metrics.count += 1
+    metrics.seconds += seconds
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            metrics.buckets[i] += 1
+    metrics.db.statements += stats.statements
+    metrics.db.sql_seconds += stats.sql_seconds
+    metrics.db.rows += stats.rows
+    metrics.db.pool_wait_seconds += stats.pool_wait_seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    if stats := current.get():
+        stats.pool_wait_seconds += seconds
+
+
+def record_rows(count: int) -> None:
+    if stats := current.get():
+        stats.rows += count
+
+
+def render() -> str:
+    """The collected metrics in the Prometheus text exposition format."""
+
+    def labels(key: Labels, **extra: str) -> str:
+        method, route, status = key
+        pairs = {"method": method, "route": route, "status": status} | extra
+        return ",".join(f'{name}="{value}"' for name, value in pairs.items())
+
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for key, metrics in sorted(routes.items()):
+        for bound, count in zip(BUCKETS, metrics.buckets, strict=True):
+            lines.append(
+                f"http_request_duration_seconds_bucket{{{labels(key, le=str(bound))}}}"
+                f" {count}"
+            )
+        lines += [
+            f"http_request_duration_seconds_bucket{{{labels(key, le='+Inf')}}}"
+            f" {metrics.count}",
+            f"http_request_duration_seconds_sum{{{labels(key)}}} {metrics.seconds}",
+            f"http_request_duration_seconds_count{{{labels(key)}}} {metrics.count}",
+        ]
+    for name, description, value in [
+        ("db_statements_total", "SQL statements executed.", "statements"),
+        ("db_statement_seconds_total", "Time spent executing SQL.", "sql_seconds"),
+        ("db_rows_total", "Rows returned, or affected by DML.", "rows"),
+        (
+            "db_pool_wait_seconds_total",
+            "Time spent waiting for a database connection.",
+            "pool_wait_seconds",
+        ),
+    ]:
+        lines += [
+            f"# HELP {name} {description} By route template.",
+            f"# TYPE {name} counter",
+        ]
+        lines.extend(
+            f"{name}{{{labels(key)}}} {getattr(metrics.db, value)}"
+            for key, metrics in sorted(routes.items())
+        )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Times each request and attributes its database work to its route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current.reset(token)
+            # Routing fills in the matched route; unmatched paths share one label
+            # so that they can't grow the label set without bound
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", ""), str(status))
+            observe(labels, time.perf_counter() - started, stats)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+
+
+def instrument(engine: AsyncEngine) -> None:
+    """Counts and times every statement `engine` runs for the current request.
+
+    With `slow_query_ms` set, statements slower than it are also logged.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_timer(
+        connection: Connection,
+        _cursor: DBAPICursor,
+        _statement: str,
+        _parameters: Any,  # noqa: ANN401
+        _context: ExecutionContext | None,
+        _executemany: bool,
+    ) -> None:
+        connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def stop_timer(
+        connection: Connection,
+        _cursor: DBAPICursor,
+        statement: str,
+        _parameters: Any,  # noqa: ANN401
+        _context: ExecutionContext | None,
+        _executemany: bool,
+    ) -> None:
+        seconds = time.perf_counter() - connection.info["query_started"].pop()
+        if stats := current.get():
+            stats.statements += 1
+            stats.sql_seconds += seconds
+        if config.slow_query_ms is not None and seconds * 1000 >= config.slow_query_ms:
+            logger.warning("Slow query (%.1f ms): %s", seconds * 1000, statement)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def count_rows(state: ORMExecuteState) -> Result[Any] | None:
+    """Counts the rows a session's statement returned, or its DML affected.
+
+    The result is buffered to count its rows, as the asyncio driver adapters
+    buffer it on execute anyway. Streamed results are left alone, whoever
+    fetches them records their rows.
+    """
+    if current.get() is None:
+        return None
+    options = state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None
+    result = state.invoke_statement()
+    if isinstance(result, CursorResult) and not result.returns_rows:
+        record_rows(max(result.rowcount, 0))
+        return result
+    if (
+        state.is_insert or state.is_update or state.is_delete
+    ) and not state.statement.exported_columns:
+        # An ORM bulk statement without RETURNING, one row per parameter set
+        parameters = state.parameters
+        record_rows(1 if isinstance(parameters, Mapping) else len(parameters or ()))
+        return result
+    frozen = result.freeze()
+    record_rows(len(frozen.data))
+    return frozen()
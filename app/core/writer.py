@@ -0,0 +1,101 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+class SerialWriter:
+    """Funnels every write transaction through a single connection.
+
+    Writers queue on an `asyncio.Lock` instead of on the SQLite write lock, so
+    concurrent writes never fail with "database is locked". Each write runs in
+    a SAVEPOINT of one long-lived transaction; the writer that finds nobody
+    queued behind it commits for the whole group, and every writer in the
+    group waits for that commit before returning. A write that fails is rolled
+    back to its own SAVEPOINT, even after `session.commit()` released the
+    session's, so it never commits with the rest of its group. A group of only
+    failed writes is rolled back instead, so the SQLite write lock is never
+    held past the last writer.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_group_size: int = 64) -> None:
+        self.engine = engine
+        self.max_group_size = max_group_size
+        self.commits = 0
+        self._lock = asyncio.Lock()
+        self._queued = 0
+        self._connection: AsyncConnection | None = None
+        self._group: list[asyncio.Future[None]] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncConnection]:
+        """Yields the writer connection, inside a transaction, for one write."""
+        self._queued += 1
+        try:
+            await self._lock.acquire()
+        except asyncio.CancelledError:
+            self._queued -= 1
+            if not self._queued:
+                # The writer ahead left its group to this one to commit
+                task = asyncio.create_task(self._settle())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            raise
+        self._queued -= 1
+        try:
+            if self._connection is None:
+                self._connection = await self.engine.connect()
+            if not self._connection.in_transaction():
+                await self._connection.begin()
+            savepoint = await self._connection.begin_nested()
+            try:
+                yield self._connection
+            except BaseException:
+                await savepoint.rollback()
+                raise
+            await savepoint.commit()
+            committed = asyncio.get_running_loop().create_future()
+            self._group.append(committed)
+        finally:
+            try:
+                if not self._queued or len(self._group) >= self.max_group_size:
+                    await self._finish()
+            finally:
+                self._lock.release()
+        await committed
+
+    async def _settle(self) -> None:
+        async with self._lock:
+            # A writer that queued since will finish the transaction itself
+            if not self._queued:
+                await self._finish()
+
+    async def _finish(self) -> None:
+        if self._group:
+            await self._commit()
+        elif self._connection is not None and self._connection.in_transaction():
+            # Only failed writes ran, their SAVEPOINTs are already rolled back
+            await self._connection.rollback()
+
+    async def _commit(self) -> None:
+        group, self._group = self._group, []
+        try:
+            if self._connection is not None:
+                await self._connection.commit()
+        except Exception as e:
+            await self.close()
+            for committed in group:
+                if not committed.done():
+                    committed.set_exception(e)
+        else:
+            self.commits += 1
+            for committed in group:
+                if not committed.done():
+                    committed.set_result(None)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
@@ -1,15 +1,45 @@
+import time
 from collections.abc import AsyncGenerator
 from typing import Annotated
 
 from fastapi import Depends
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.db import engine
+from app.changes import change_feed
+from app.core import db, metrics
+from app.core.cache import response_cache
 
 
-async def get_session() -> AsyncGenerator[AsyncSession]:
-    async with AsyncSession(engine) as session:
+async def get_read_session() -> AsyncGenerator[AsyncSession]:
+    async with AsyncSession(db.read_engine, expire_on_commit=False) as session:
         yield session
 
 
-SessionDep = Annotated[AsyncSession, Depends(get_session)]
+async def get_write_session() -> AsyncGenerator[AsyncSession]:
+    # Nothing is expired on commit, so written objects can be serialized as-is
+    # without a refresh round trip.
+    if db.writer is None:
+        async with AsyncSession(db.write_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        # `session.commit()` releases a SAVEPOINT, the writer commits the group
+        started = time.perf_counter()
+        async with (
+            db.writer.transaction() as connection,
+            AsyncSession(
+                connection,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ) as session,
+        ):
+            # Queueing for the writer is this engine's pool wait
+            metrics.record_pool_wait(time.perf_counter() - started)
+            yield session
+    response_cache.invalidate(*session.info.get("cache_invalidations", ()))
+    # The write's changes are committed, so subscribers needn't wait for a poll
+    change_feed.wake()
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+# Ends before the response is sent, so it is only sent once the write is durable
+WriteSessionDep = Annotated[AsyncSession, Depends(get_write_session, scope="function")]
@@ -0,0 +1,40 @@
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import metrics
+from app.core.config import config
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def columns(table: type[SQLModel], public: type[SQLModel]) -> list[Any]:
+    """The columns of `table` that `public` serializes, so rows skip the ORM."""
+    return [getattr(table, name) for name in public.model_fields]
+
+
+def stream_ndjson(
+    session: AsyncSession, query: Select[Any], public: type[SQLModel]
+) -> StreamingResponse:
+    """Streams the rows of `query` as NDJSON from a server-side cursor.
+
+    Rows are fetched and written `export_batch_size` at a time, so memory stays
+    flat however large the table. The export is one SELECT, so it reads one
+    consistent snapshot even while writes land.
+    """
+
+    async def lines() -> AsyncIterator[bytes]:
+        result = await session.stream(
+            query.execution_options(yield_per=config.export_batch_size)
+        )
+        async for rows in result.mappings().partitions():
+            metrics.record_rows(len(rows))
+            yield "".join(
+                public.model_validate(row).model_dump_json() + "\n" for row in rows
+            ).encode()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Query, Request, status
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import loading
+from app.deps import ReadSessionDep
+from app.models import Hero, Mission, Team
+
+# Ids a multi-get takes, each one a bound parameter of its `IN (...)`
+MAX_IDS = 100
+IdsQuery = Annotated[list[uuid.UUID] | None, Query(min_length=1, max_length=MAX_IDS)]
+
+
+def ids_alone(request: Request) -> None:
+    """Rejects `ids` along with other query parameters, which a multi-get ignores."""
+    params = request.query_params
+    if "ids" in params and (others := sorted(set(params) - {"ids"})):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"ids can't be combined with {', '.join(others)}",
+        )
+
+
+class Loader[K, V]:
+    """Batches the `load`s a request makes into one `fetch` per batch.
+
+    Keys requested before the event loop gets back to the loader, by one
+    `load_many` or by concurrent `load`s, are fetched together, each key once.
+    Values aren't kept past their batch, so a loader never serves rows read
+    before a write.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[K]], Awaitable[Iterable[V]]],
+        key: Callable[[V], K],
+    ) -> None:
+        self.fetch = fetch
+        self.key = key
+        self.batches = 0
+        self.pending: dict[K, asyncio.Future[V | None]] = {}
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    def load(self, key: K) -> asyncio.Future[V | None]:
+        """Resolves to the value for `key`, or None if its batch found none."""
+        if future := self.pending.get(key):
+            return future
+        if not self.pending:
+            task = asyncio.create_task(self.dispatch())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        future = self.pending[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        """The values for `keys` in the same order, None for keys not found."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    async def dispatch(self) -> None:
+        # Let the tasks started alongside the first load queue their keys too
+        await asyncio.sleep(0)
+        batch, self.pending = self.pending, {}
+        self.batches += 1
+        try:
+            values = await self.fetch(list(batch))
+        except Exception as error:
+            for future in batch.values():
+                if not future.cancelled():
+                    future.set_exception(error)
+            return
+        found = {self.key(value): value for value in values}
+        for key, future in batch.items():
+            if not future.cancelled():
+                future.set_result(found.get(key))
+
+
+def by_id[T: (Hero, Team, Mission)](
+    session: AsyncSession, model: type[T], options: Sequence[ORMOption]
+) -> Loader[uuid.UUID, T]:
+    """A loader of `model` rows by id, with the eager loads in `options`."""
+
+    async def fetch(ids: list[uuid.UUID]) -> Sequence[T]:
+        # One `WHERE id IN (...)` per batch, plus one statement for each
+        # selectin-loaded relationship
+        results = await session.exec(
+            select(model)
+            .where(col(model.id).in_(ids))
+            .options(*options)
+            .execution_options(populate_existing=True)
+        )
+        return results.all()
+
+    return Loader(fetch, lambda row: row.id)
+
+
+# One loader per request and entity, each with the loads of its detail response
+def get_hero_loader(session: ReadSessionDep) -> Loader[uuid.UUID, Hero]:
+    return by_id(session, Hero, loading.HERO_WITH_TEAM_MISSIONS)
+
+
+def get_team_loader(session: ReadSessionDep) -> Loader[uuid.UUID, Team]:
+    return by_id(session, Team, loading.TEAM_WITH_HEROES)
+
+
+def get_mission_loader(session: ReadSessionDep) -> Loader[uuid.UUID, Mission]:
+    return by_id(session, Mission, loading.MISSION_WITH_HEROES)
+
+
+HeroLoaderDep = Annotated[Loader[uuid.UUID, Hero], Depends(get_hero_loader)]
+TeamLoaderDep = Annotated[Loader[uuid.UUID, Team], Depends(get_team_loader)]
+MissionLoaderDep = Annotated[Loader[uuid.UUID, Mission], Depends(get_mission_loader)]
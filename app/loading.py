@@ -0,0 +1,20 @@
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from app.models import Hero, Mission, Team
+
+# Relationships on the table models raise instead of lazy loading, so every
+# route that serializes a nested response model opts into the eager loads that
+# response model needs with one of these profiles.
+
+HERO_WITH_TEAM_MISSIONS: tuple[ORMOption, ...] = (
+    joinedload(Hero.team),
+    selectinload(Hero.missions),
+)
+"""Loads for `HeroPublicWithTeamMissions`."""
+
+TEAM_WITH_HEROES: tuple[ORMOption, ...] = (selectinload(Team.heroes),)
+"""Loads for `TeamPublicWithHeroes`."""
+
+MISSION_WITH_HEROES: tuple[ORMOption, ...] = (selectinload(Mission.heroes),)
+"""Loads for `MissionPublicWithHeroes`."""
@@ -1,15 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from datetime import UTC, datetime
+
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app import changes, conditional, loading
 from app.api import api_router
+from app.changes import change_feed
+from app.core import budget, compression, db, metrics
+from app.core.cache import response_cache, single_flight
 from app.core.config import config
-from app.deps import SessionDep
-from app.models import HealthCheck
+from app.core.health import pool_usage, readiness
+from app.deps import get_write_session
+from app.models import CacheStats, HealthCheck, Hero, Mission, Readiness, Team
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+async def prepare_statements(session: AsyncSession) -> None:
+    """Runs the statements behind the hottest routes, which find no rows here."""
+    nil = uuid.UUID(int=0)
+    await session.exec(
+        select(Hero).order_by(col(Hero.name), col(Hero.id)).offset(0).limit(1)
+    )
+    await session.exec(
+        select(Team).order_by(col(Team.name), col(Team.id)).offset(0).limit(1)
+    )
+    await session.get(Hero, nil, options=loading.HERO_WITH_TEAM_MISSIONS)
+    await session.get(Team, nil, options=loading.TEAM_WITH_HEROES)
+    await session.get(Mission, nil, options=loading.MISSION_WITH_HEROES)
+    await conditional.current_hero(session, nil)
+    await conditional.current_team(session, nil)
+    await conditional.current_mission(session, nil)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    db.connect(config)
+    try:
+        if config.db_warm_pool:
+            await db.warm(prepare_statements if config.db_prepare_statements else None)
+        tasks = [
+            asyncio.create_task(readiness.run(db.read_engine)),
+            asyncio.create_task(change_feed.run(db.read_engine)),
+        ]
+        if config.changes_retention:
+            pruning = changes.run_retention(
+                asynccontextmanager(get_write_session),
+                keep=config.changes_retention,
+                interval=config.changes_prune_interval,
+            )
+            tasks.append(asyncio.create_task(pruning))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+    finally:
+        await db.disconnect()
+
 
 app = FastAPI(
     title="Hero API",
     summary="A high-performance API for managing superheros.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -21,12 +83,56 @@ if config.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
 
+app.add_middleware(compression.CompressionMiddleware)  # ty:ignore[invalid-argument-type]
+app.add_middleware(budget.QueryBudgetMiddleware)  # ty:ignore[invalid-argument-type]
+app.add_middleware(metrics.MetricsMiddleware)  # ty:ignore[invalid-argument-type]
+
 app.include_router(api_router)
 
 
 @app.get("/health", tags=["status"])
-async def read_health(*, _session: SessionDep) -> HealthCheck:
+@app.get("/health/live", tags=["status"])
+async def read_health() -> HealthCheck:
     return HealthCheck(status="ok")
+
+
+@app.get("/health/ready", tags=["status"])
+async def read_readiness(*, response: Response) -> Readiness:
+    # Reports the background probe's last check, so this never touches the pool
+    check = readiness.last
+    usage = pool_usage(db.read_engine, config.db_max_overflow)
+    checked_out, capacity = usage or (None, None)
+    ready = readiness.is_ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return Readiness(
+        status="ok" if ready else "unavailable",
+        checked_at=datetime.fromtimestamp(check.checked_at, UTC) if check else None,
+        db_latency_ms=check.latency_ms if check else None,
+        error=check.error if check else None,
+        pool_checked_out=checked_out,
+        pool_capacity=capacity,
+    )
+
+
+@app.get("/metrics", tags=["status"], response_class=PlainTextResponse)
+async def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/cache/stats", tags=["status"])
+async def read_cache_stats() -> CacheStats:
+    return CacheStats(
+        enabled=response_cache.enabled,
+        entries=len(response_cache),
+        hits=response_cache.hits,
+        misses=response_cache.misses,
+        evictions=response_cache.evictions,
+        coalesced=single_flight.coalesced,
+    )
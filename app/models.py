@@ -1,6 +1,8 @@
 import uuid
+from datetime import datetime
+from typing import Literal
 
-from sqlmodel import Field, MetaData, Relationship, SQLModel
+from sqlmodel import Field, Index, MetaData, Relationship, SQLModel
 
 sqlite_naming_convention = {
     "ix": "ix_%(column_0_label)s",
@@ -14,16 +16,24 @@ SQLModel.metadata = MetaData(naming_convention=sqlite_naming_convention)
 
 
 class TeamBase(SQLModel):
-    name: str = Field(index=True)
+    name: str
     headquarters: str
 
 
 class Team(TeamBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    # Keyset pagination sorts and seeks on (name, id)
+    __table_args__ = (Index("ix_team_name_id", "name", "id"),)
+
+    # UUIDv7 ids are time-ordered, so new rows append to the primary key index
+    # instead of landing on random pages of it
+    id: uuid.UUID = Field(default_factory=uuid.uuid7, primary_key=True)
+
+    # Bumped by every write to the row, detail ETags are built from it
+    version: int = Field(default=1)
 
     heroes: list[Hero] = Relationship(
         back_populates="team",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
 
 
@@ -39,12 +49,37 @@ class TeamPublicWithHeroes(TeamPublic):
     heroes: list[HeroPublic] = []
 
 
+class TeamPublicWithHeroPreview(TeamPublic):
+    """Models a team with the first of its heroes, and how many it has."""
+
+    heroes: list[HeroPublic] = []
+    hero_count: int
+
+
+class TeamLookup(SQLModel):
+    """Models one id of a multi-get, with its team or why there is none."""
+
+    id: uuid.UUID
+    status: int
+    team: TeamPublicWithHeroes | None = None
+    detail: str | None = None
+
+
 class TeamUpdate(SQLModel):
     name: str | None = None
     headquarters: str | None = None
 
 
+class TeamBulkUpdate(TeamUpdate):
+    id: uuid.UUID
+
+
 class HeroMissionLink(SQLModel, table=True):
+    # A mission's heroes are listed, and paged, by hero id
+    __table_args__ = (
+        Index("ix_heromissionlink_mission_id_hero_id", "mission_id", "hero_id"),
+    )
+
     hero_id: uuid.UUID | None = Field(
         default=None, foreign_key="hero.id", primary_key=True
     )
@@ -54,24 +89,35 @@ class HeroMissionLink(SQLModel, table=True):
 
 
 class HeroBase(SQLModel):
-    name: str = Field(index=True)
+    name: str
     secret_name: str
-    age: int | None = Field(default=None, index=True)
+    age: int | None = None
 
     team_id: uuid.UUID | None = Field(default=None, foreign_key="team.id")
 
 
 class Hero(HeroBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    # Keyset pagination sorts and seeks on (name, id), or on (age, id), and a
+    # team's heroes on (name, id) within the team
+    __table_args__ = (
+        Index("ix_hero_name_id", "name", "id"),
+        Index("ix_hero_age_id", "age", "id"),
+        Index("ix_hero_team_id_name_id", "team_id", "name", "id"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid7, primary_key=True)
+
+    # Bumped by every write to the row, detail ETags are built from it
+    version: int = Field(default=1)
 
     team: Team | None = Relationship(
         back_populates="heroes",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
     missions: list[Mission] = Relationship(
         back_populates="heroes",
         link_model=HeroMissionLink,
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
 
 
@@ -88,6 +134,23 @@ class HeroPublicWithTeamMissions(HeroPublic):
     missions: list[MissionPublic] = []
 
 
+class HeroPublicWithTeamMissionPreview(HeroPublic):
+    """Models a hero with its team, the first of its missions, and how many."""
+
+    team: TeamPublic | None = None
+    missions: list[MissionPublic] = []
+    mission_count: int
+
+
+class HeroLookup(SQLModel):
+    """Models one id of a multi-get, with its hero or why there is none."""
+
+    id: uuid.UUID
+    status: int
+    hero: HeroPublicWithTeamMissions | None = None
+    detail: str | None = None
+
+
 class HeroUpdate(SQLModel):
     name: str | None = None
     secret_name: str | None = None
@@ -96,18 +159,25 @@ class HeroUpdate(SQLModel):
     team_id: uuid.UUID | None = None
 
 
+class HeroBulkUpdate(HeroUpdate):
+    id: uuid.UUID
+
+
 class MissionBase(SQLModel):
     description: str
     active: bool = Field(default=True)
 
 
 class Mission(MissionBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    id: uuid.UUID = Field(default_factory=uuid.uuid7, primary_key=True)
+
+    # Bumped by every write to the row, detail ETags are built from it
+    version: int = Field(default=1)
 
     heroes: list[Hero] = Relationship(
         back_populates="missions",
         link_model=HeroMissionLink,
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise_on_sql"},
     )
 
 
@@ -123,17 +193,145 @@ class MissionPublicWithHeroes(MissionPublic):
     heroes: list[HeroPublic] = []
 
 
+class MissionPublicWithHeroPreview(MissionPublic):
+    """Models a mission with the first of its heroes, and how many it has."""
+
+    heroes: list[HeroPublic] = []
+    hero_count: int
+
+
+class MissionLookup(SQLModel):
+    """Models one id of a multi-get, with its mission or why there is none."""
+
+    id: uuid.UUID
+    status: int
+    mission: MissionPublicWithHeroes | None = None
+    detail: str | None = None
+
+
 class MissionUpdate(SQLModel):
     description: str | None = None
     active: bool | None = None
 
 
+class MissionBulkUpdate(MissionUpdate):
+    id: uuid.UUID
+
+
+class SearchDocument(SQLModel, table=True):
+    # Filled in by triggers on the entity tables, `docid` is the rowid of the
+    # row's entry in its entity's FTS5 table, see `app.search`
+    __table_args__ = (
+        Index("ix_searchdocument_entity_entity_id", "entity", "entity_id", unique=True),
+    )
+
+    docid: int | None = Field(default=None, primary_key=True)
+    entity: str
+    entity_id: uuid.UUID
+
+
+class Change(SQLModel, table=True):
+    # The outbox of writes, filled in by triggers on the entity and link tables,
+    # see `app.changes`. Never reusing a `seq` keeps resumed feeds consistent.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: int | None = Field(default=None, primary_key=True)
+    entity: str
+    entity_id: uuid.UUID
+    action: str
+    # The hero assigned to, or unassigned from, the mission
+    hero_id: uuid.UUID | None = None
+
+
+class ChangePublic(SQLModel):
+    """Models one write to a hero, team or mission, in commit order by `seq`."""
+
+    seq: int
+    entity: Literal["hero", "team", "mission"]
+    entity_id: uuid.UUID
+    action: Literal["create", "update", "delete", "assign", "unassign"]
+    hero_id: uuid.UUID | None = None
+
+
+class HeroMissionAssignment(SQLModel):
+    hero_id: uuid.UUID
+    mission_id: uuid.UUID
+
+
+class RosterChange(SQLModel):
+    """Models how a request changed a mission's roster of heroes."""
+
+    added: list[uuid.UUID] = []
+    removed: list[uuid.UUID] = []
+    not_found: list[uuid.UUID] = []
+
+
+class TeamStats(SQLModel):
+    """Models the hero count and average hero age of one team."""
+
+    id: uuid.UUID
+    name: str
+    heroes: int
+    average_age: float | None
+
+
+class MissionStats(SQLModel):
+    """Models mission and assignment counts across all missions."""
+
+    missions: int
+    active_missions: int
+    assignments: int
+    active_assignments: int
+    heroes_on_active_missions: int
+
+
+class SearchResult(SQLModel):
+    """Models one full-text search match, lower ranks match better."""
+
+    entity: Literal["hero", "team", "mission"]
+    id: uuid.UUID
+    title: str
+    rank: float
+
+
 class HealthCheck(SQLModel):
     """Models a status check for our /health endpoint."""
 
     status: str
 
 
+class Readiness(SQLModel):
+    """Models the last database check for our /health/ready endpoint."""
+
+    status: str
+    checked_at: datetime | None
+    db_latency_ms: float | None
+    error: str | None
+    pool_checked_out: int | None
+    pool_capacity: int | None
+
+
+class CacheStats(SQLModel):
+    """Models the counters of the in-process response cache."""
+
+    enabled: bool
+    entries: int
+    hits: int
+    misses: int
+    evictions: int
+    # Loads saved by concurrent requests sharing one
+    coalesced: int
+
+
+class BulkResult(SQLModel):
+    """Models the outcome of one item of a bulk request, by its payload index."""
+
+    index: int
+    status: int
+    id: uuid.UUID | None = None
+    detail: str | None = None
+
+
 class Message(SQLModel):
     """Models a generic messages, used as a response model in routes."""
 
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import ColumnElement, and_, or_, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: object) -> str:
+    """Packs the sort key of the last row on a page into an opaque cursor."""
+    data = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor[T](cursor: str, adapter: TypeAdapter[T]) -> T:
+    """Unpacks a cursor made by `encode_cursor`, validating it against `adapter`."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return adapter.validate_python(json.loads(data))
+    except (binascii.Error, ValueError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from e
+
+
+def trim[T](
+    rows: Sequence[T],
+    limit: int,
+    response: Response,
+    sort_key: Callable[[T], Sequence[object]],
+) -> Sequence[T]:
+    """Cuts the row fetched past `limit`, pointing the next cursor after the page.
+
+    Queries fetch `limit + 1` rows, so that the extra row tells whether there is
+    a next page.
+    """
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*sort_key(rows[-1]))
+    return rows
+
+
+def seek(
+    columns: Sequence[ColumnElement[Any]], values: Sequence[Any]
+) -> ColumnElement[bool]:
+    """Matches rows that sort after `values` on `columns`, using their index."""
+    return tuple_(*columns) > tuple_(*values)
+
+
+def seek_nullable(
+    column: ColumnElement[Any],
+    tiebreaker: ColumnElement[Any],
+    value: object,
+    last: object,
+    *,
+    descending: bool = False,
+) -> ColumnElement[bool]:
+    """Like `seek` on `(column, tiebreaker)` when `column` may be NULL.
+
+    NULLs sort first ascending and last descending, matching SQLite's default
+    order, so the index on `(column, tiebreaker)` still serves the sort.
+    """
+    if descending:
+        if value is None:
+            return and_(column.is_(None), tiebreaker < last)
+        return or_(tuple_(column, tiebreaker) < tuple_(value, last), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), tiebreaker > last), column.is_not(None))
+    return tuple_(column, tiebreaker) > tuple_(value, last)
@@ -0,0 +1,60 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+
+from app import changes
+from app.changes import EVENT_STREAM_MEDIA_TYPE, change_feed
+from app.core.budget import query_budget
+from app.deps import ReadSessionDep
+from app.models import ChangePublic
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("/", response_model=list[ChangePublic], dependencies=[query_budget(3)])
+async def read_changes(
+    *,
+    session: ReadSessionDep,
+    # The last `seq` the client has seen, by default only changes from now on
+    since: Annotated[int | None, Query(ge=0)] = None,
+    # Seconds a long poll waits for a change, or an event stream stays open
+    wait: Annotated[float, Query(ge=0, le=300)] = 30.0,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 100,
+    accept: Annotated[str | None, Header()] = None,
+    last_event_id: Annotated[int | None, Header(ge=0)] = None,
+) -> Response:
+    """Long polls for the changes after `since`, or streams them as events.
+
+    Clients that accept `text/event-stream` get Server-Sent Events, which an
+    EventSource resumes through Last-Event-ID when it reconnects. Everyone else
+    gets the changes as a list, as soon as there are any or after `wait`
+    seconds, and polls again with the last `seq` in it. Clients so far behind
+    that the changes they missed were pruned get a 410, and start over.
+    """
+    if since is None:
+        since = last_event_id
+    if since is None:
+        since = await changes.latest_seq(session)
+    backlog = change_feed.after(since)
+    if backlog is None:
+        # Further behind than the feed keeps in memory, so read the outbox
+        backlog = await changes.read(session, since, limit)
+        # Pruning is what leaves a gap after `since`, so only then look for it
+        gap = not backlog or backlog[0].seq > since + 1
+        if gap and since < await changes.horizon(session):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Changes after since were pruned",
+            )
+    # Waiting for changes holds no connection
+    await session.close()
+    if accept is not None and EVENT_STREAM_MEDIA_TYPE in accept:
+        return StreamingResponse(
+            changes.stream(since, backlog, wait),
+            media_type=EVENT_STREAM_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache"},
+        )
+    if not backlog:
+        backlog = await change_feed.wait(since, wait) or []
+    return Response(changes.json_list(backlog[:limit]), media_type="application/json")
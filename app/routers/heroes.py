@@ -1,108 +1,486 @@
+import sys
 import uuid
 from collections.abc import Sequence
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Body, HTTPException, Path, Query, status
-from sqlmodel import select
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import joinedload
+from sqlmodel import col, delete, func, insert, select, update
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.deps import SessionDep
+from app import bulk, conditional, export, filters, loading, pagination
+from app.core import cache
+from app.core.budget import query_budget
+from app.core.cache import CacheEntry, response_cache, single_flight
+from app.core.config import config
+from app.deps import ReadSessionDep, WriteSessionDep
+from app.loaders import HeroLoaderDep, IdsQuery, ids_alone
 from app.models import (
+    BulkResult,
     Hero,
+    HeroBulkUpdate,
     HeroCreate,
+    HeroLookup,
+    HeroMissionLink,
     HeroPublic,
+    HeroPublicWithTeamMissionPreview,
     HeroPublicWithTeamMissions,
     HeroUpdate,
+    Mission,
+    MissionPublic,
     Team,
+    TeamPublic,
 )
+from app.serialization import RowSerializer
 
 router = APIRouter(prefix="/heroes", tags=["heroes"])
 
+HeroSort = Literal["name", "age", "-age"]
+HeroNameCursor = TypeAdapter(tuple[str, uuid.UUID])
+HeroAgeCursor = TypeAdapter(tuple[int | None, uuid.UUID])
+MissionCursor = TypeAdapter(tuple[uuid.UUID])
+HERO_ROWS = RowSerializer(Hero, HeroPublic)
+
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=HeroPublic)
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=HeroPublic,
+    dependencies=[query_budget(1)],
+)
 async def create_hero(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     hero: Annotated[HeroCreate, Body()],
 ) -> Hero:
     db_hero = Hero.model_validate(hero)
     session.add(db_hero)
     await session.commit()
-    await session.refresh(db_hero)
+    if db_hero.team_id:
+        cache.invalidate(session, ("team", db_hero.team_id))
     return db_hero
 
 
-@router.get("/", response_model=list[HeroPublic])
+@router.post(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def create_heroes(
+    *,
+    session: WriteSessionDep,
+    heroes: Annotated[list[HeroCreate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    db_heroes = [Hero.model_validate(hero) for hero in heroes]
+    for chunk in bulk.chunks(db_heroes, chunk_size):
+        await session.exec(insert(Hero), params=[hero.model_dump() for hero in chunk])
+    await session.commit()
+    cache.invalidate(
+        session, *{("team", hero.team_id) for hero in db_heroes if hero.team_id}
+    )
+    return [
+        BulkResult(index=index, id=hero.id, status=status.HTTP_201_CREATED)
+        for index, hero in enumerate(db_heroes)
+    ]
+
+
+@router.patch(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def update_heroes(
+    *,
+    session: WriteSessionDep,
+    heroes: Annotated[list[HeroBulkUpdate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    results: list[BulkResult] = []
+    updated: set[cache.CacheKey] = set()
+    for chunk in bulk.chunks(list(enumerate(heroes)), chunk_size):
+        ids = [hero.id for _, hero in chunk]
+        existing = await session.exec(
+            select(Hero.id, Hero.version).where(col(Hero.id).in_(ids))
+        )
+        found = dict(existing.all())
+        params = [
+            hero.model_dump(exclude_unset=True)
+            | {"id": hero.id, "version": found[hero.id] + 1}
+            for _, hero in chunk
+            if hero.id in found
+        ]
+        if params:
+            await session.exec(update(Hero), params=params)
+        for hero in params:
+            updated.add(("hero", hero["id"]))
+            if hero.get("team_id"):
+                updated.add(("team", hero["team_id"]))
+        results.extend(
+            BulkResult(index=index, id=hero.id, status=status.HTTP_200_OK)
+            if hero.id in found
+            else BulkResult(
+                index=index,
+                id=hero.id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Hero not found",
+            )
+            for index, hero in chunk
+        )
+    await session.commit()
+    cache.invalidate(session, *updated)
+    return results
+
+
+@router.delete(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def delete_heroes(
+    *,
+    session: WriteSessionDep,
+    hero_ids: Annotated[list[uuid.UUID], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    deleted: set[uuid.UUID] = set()
+    for chunk in bulk.chunks(hero_ids, chunk_size):
+        await session.exec(
+            delete(HeroMissionLink).where(col(HeroMissionLink.hero_id).in_(chunk))
+        )
+        result = await session.exec(
+            delete(Hero).where(col(Hero.id).in_(chunk)).returning(col(Hero.id))
+        )
+        deleted.update(result.scalars())
+    await session.commit()
+    cache.invalidate(session, *(("hero", hero_id) for hero_id in deleted))
+    return [
+        BulkResult(index=index, id=hero_id, status=status.HTTP_204_NO_CONTENT)
+        if hero_id in deleted
+        else BulkResult(
+            index=index,
+            id=hero_id,
+            status=status.HTTP_404_NOT_FOUND,
+            detail="Hero not found",
+        )
+        for index, hero_id in enumerate(hero_ids)
+    ]
+
+
+# A page is 1 statement, resolving `ids` 2 with the missions' selectin load
+@router.get(
+    "/",
+    response_model=list[HeroPublic] | list[HeroLookup],
+    dependencies=[query_budget(2), Depends(ids_alone)],
+)
 async def read_heroes(
     *,
-    session: SessionDep,
+    session: ReadSessionDep,
+    loader: HeroLoaderDep,
+    response: Response,
+    # Fetch these heroes, with their team and missions, instead of a page
+    ids: IdsQuery = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(gt=0)] = 100,
-) -> Sequence[Hero]:
-    results = await session.exec(select(Hero).offset(offset).limit(limit))
-    return results.all()
+    after: Annotated[str | None, Query()] = None,
+    name: Annotated[str | None, Query(min_length=1)] = None,
+    age_min: Annotated[int | None, Query()] = None,
+    age_max: Annotated[int | None, Query()] = None,
+    team_id: Annotated[uuid.UUID | None, Query()] = None,
+    mission_id: Annotated[uuid.UUID | None, Query()] = None,
+    sort: Annotated[HeroSort, Query()] = "name",
+) -> Sequence[Hero] | list[HeroLookup] | Response:
+    if ids is not None:
+        heroes = await loader.load_many(ids)
+        return [
+            HeroLookup(id=hero_id, status=status.HTTP_200_OK, hero=hero)
+            if hero
+            else HeroLookup(
+                id=hero_id, status=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+            )
+            for hero_id, hero in zip(ids, heroes, strict=True)
+        ]
+    # Each filter and sort is served by an index: (name, id), (age, id),
+    # team_id and heromissionlink.mission_id
+    query = select(*HERO_ROWS.columns) if config.fast_responses else select(Hero)
+    if name is not None:
+        query = query.where(filters.starts_with(col(Hero.name), name))
+    if age_min is not None or age_max is not None:
+        # Bounded on both ends, so the planner estimates the range as selective
+        # and searches (age, id) instead of walking the name index in order
+        query = query.where(
+            col(Hero.age).between(
+                age_min if age_min is not None else -sys.maxsize - 1,
+                age_max if age_max is not None else sys.maxsize,
+            )
+        )
+    if team_id is not None:
+        query = query.where(col(Hero.team_id) == team_id)
+    if mission_id is not None:
+        query = query.where(
+            col(Hero.id).in_(
+                select(HeroMissionLink.hero_id).where(
+                    col(HeroMissionLink.mission_id) == mission_id
+                )
+            )
+        )
+    if sort == "name":
+        sort_key = (col(Hero.name), col(Hero.id))
+        query = query.order_by(*sort_key)
+        if after is not None:
+            query = query.where(
+                pagination.seek(
+                    sort_key, pagination.decode_cursor(after, HeroNameCursor)
+                )
+            )
+    else:
+        descending = sort == "-age"
+        if descending:
+            query = query.order_by(col(Hero.age).desc(), col(Hero.id).desc())
+        else:
+            query = query.order_by(col(Hero.age), col(Hero.id))
+        if after is not None:
+            age, last_id = pagination.decode_cursor(after, HeroAgeCursor)
+            query = query.where(
+                pagination.seek_nullable(
+                    col(Hero.age), col(Hero.id), age, last_id, descending=descending
+                )
+            )
+    results = await session.exec(query.offset(offset).limit(limit + 1))
+    heroes = results.all()
+    if len(heroes) > limit:
+        heroes = heroes[:limit]
+        last = heroes[-1]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(
+            last.name if sort == "name" else last.age, last.id
+        )
+    if config.fast_responses:
+        return HERO_ROWS.response(heroes, response.headers)
+    return heroes
 
 
-@router.get("/{hero_id}", response_model=HeroPublicWithTeamMissions)
-async def read_hero(
+@router.get("/export", response_class=StreamingResponse, dependencies=[query_budget(1)])
+async def export_heroes(
+    *,
+    session: ReadSessionDep,
+    team_id: Annotated[uuid.UUID | None, Query()] = None,
+) -> StreamingResponse:
+    query = select(*export.columns(Hero, HeroPublic)).order_by(col(Hero.id))
+    if team_id is not None:
+        query = query.where(col(Hero.team_id) == team_id)
+    return export.stream_ndjson(session, query, HeroPublic)
+
+
+def hero_missions(hero_id: uuid.UUID) -> SelectOfScalar[Mission]:
+    """The hero's missions, in the order of its (hero_id, mission_id) links."""
+    return (
+        select(Mission)
+        .join(HeroMissionLink, col(HeroMissionLink.mission_id) == col(Mission.id))
+        .where(col(HeroMissionLink.hero_id) == hero_id)
+        .order_by(col(HeroMissionLink.mission_id))
+    )
+
+
+async def read_hero_preview(
+    session: ReadSessionDep, hero_id: uuid.UUID, preview: int
+) -> Response:
+    mission_count = (
+        select(func.count())
+        .select_from(HeroMissionLink)
+        .where(col(HeroMissionLink.hero_id) == col(Hero.id))
+        .scalar_subquery()
+    )
+    found = await session.exec(
+        select(Hero, mission_count)
+        .options(joinedload(Hero.team))
+        .where(col(Hero.id) == hero_id)
+    )
+    row = found.one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+        )
+    hero, count = row
+    missions = await session.exec(hero_missions(hero_id).limit(preview))
+    content = HeroPublicWithTeamMissionPreview(
+        **HeroPublic.model_validate(hero).model_dump(),
+        team=TeamPublic.model_validate(hero.team) if hero.team else None,
+        missions=[MissionPublic.model_validate(mission) for mission in missions],
+        mission_count=count,
+    ).model_dump_json()
+    return Response(content, media_type="application/json")
+
+
+@router.get(
+    "/{hero_id}/missions",
+    response_model=list[MissionPublic],
+    dependencies=[query_budget(2)],
+)
+async def read_hero_missions(
     *,
-    session: SessionDep,
+    session: ReadSessionDep,
+    response: Response,
     hero_id: Annotated[uuid.UUID, Path()],
-) -> Hero:
-    hero = await session.get(Hero, hero_id)
-    if not hero:
+    limit: Annotated[int, Query(gt=0)] = 100,
+    after: Annotated[str | None, Query()] = None,
+) -> Sequence[Mission]:
+    query = hero_missions(hero_id)
+    if after is not None:
+        query = query.where(
+            pagination.seek(
+                [col(HeroMissionLink.mission_id)],
+                pagination.decode_cursor(after, MissionCursor),
+            )
+        )
+    results = await session.exec(query.limit(limit + 1))
+    missions = results.all()
+    if not missions and not await session.get(Hero, hero_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
         )
-    return hero
+    return pagination.trim(missions, limit, response, lambda mission: [mission.id])
+
 
+@router.get(
+    "/{hero_id}",
+    response_model=HeroPublicWithTeamMissions | HeroPublicWithTeamMissionPreview,
+    dependencies=[query_budget(3)],
+)
+async def read_hero(
+    *,
+    session: ReadSessionDep,
+    hero_id: Annotated[uuid.UUID, Path()],
+    if_none_match: conditional.IfNoneMatchHeader = None,
+    # Embed only the first `preview` missions, and the count of all of them
+    preview: Annotated[int | None, Query(gt=0)] = None,
+) -> Response:
+    if preview is not None:
+        return await read_hero_preview(session, hero_id, preview)
+    key = ("hero", hero_id)
+    if entry := response_cache.get(key):
+        return conditional.respond(entry, if_none_match)
+    if if_none_match is not None:
+        current = await conditional.current_hero(session, hero_id)
+        if current and conditional.matches(if_none_match, current.etag, weak=True):
+            return conditional.not_modified(current.etag, if_none_match)
+    token = response_cache.token()
 
-@router.patch("/{hero_id}", response_model=HeroPublic)
+    async def load() -> CacheEntry:
+        hero = await session.get(
+            Hero,
+            hero_id,
+            options=loading.HERO_WITH_TEAM_MISSIONS,
+            populate_existing=True,
+        )
+        if not hero:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+            )
+        content = (
+            HeroPublicWithTeamMissions.model_validate(hero).model_dump_json().encode()
+        )
+        etag = conditional.hero_etag(hero)
+        # Embedded team and missions, so changes to either evict this response
+        tags = [("mission", mission.id) for mission in hero.missions]
+        if hero.team_id:
+            tags.append(("team", hero.team_id))
+        return response_cache.set(key, content, etag=etag, tags=tags, token=token)
+
+    entry = await single_flight.run(key, token, load)
+    return conditional.respond(entry, if_none_match)
+
+
+@router.patch("/{hero_id}", response_model=HeroPublic, dependencies=[query_budget(2)])
 async def update_hero(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     hero_id: Annotated[uuid.UUID, Path()],
     hero: Annotated[HeroUpdate, Body()],
+    if_match: conditional.IfMatchHeader = None,
 ) -> Hero:
-    db_hero = await session.get(Hero, hero_id)
+    hero_data = hero.model_dump(exclude_unset=True)
+    where = [col(Hero.id) == hero_id]
+    if if_match is not None:
+        current = await conditional.current_hero(session, hero_id)
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+            )
+        conditional.check_if_match(if_match, current)
+        # Lost updates from a concurrent write now match no row
+        where.append(col(Hero.version) == current.version)
+    if hero_data:
+        results = await session.exec(
+            update(Hero)
+            .where(*where)
+            .values(hero_data | {"version": col(Hero.version) + 1})
+            .returning(Hero)
+        )
+        db_hero = results.scalars().one_or_none()
+    else:
+        db_hero = await session.get(Hero, hero_id)
     if not db_hero:
+        if if_match is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="ETag does not match",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
         )
-    hero_data = hero.model_dump(exclude_unset=True)
-    db_hero.sqlmodel_update(hero_data)
-    session.add(db_hero)
     await session.commit()
-    await session.refresh(db_hero)
+    cache.invalidate(session, ("hero", hero_id))
+    if db_hero.team_id:
+        cache.invalidate(session, ("team", db_hero.team_id))
     return db_hero
 
 
-@router.patch("/{hero_id}/team/{team_id}", response_model=HeroPublic)
+@router.patch(
+    "/{hero_id}/team/{team_id}",
+    response_model=HeroPublic,
+    dependencies=[query_budget(2)],
+)
 async def assign_hero_to_team(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     hero_id: Annotated[uuid.UUID, Path()],
     team_id: Annotated[uuid.UUID, Path()],
 ) -> Hero:
-    hero = await session.get(Hero, hero_id)
-    if not hero:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+    results = await session.exec(
+        update(Hero)
+        .where(
+            col(Hero.id) == hero_id,
+            select(Team.id).where(col(Team.id) == team_id).exists(),
         )
-    team = await session.get(Team, team_id)
-    if not team:
+        .values(team_id=team_id, version=col(Hero.version) + 1)
+        .returning(Hero)
+    )
+    hero = results.scalars().one_or_none()
+    if not hero:
+        # Nothing was updated, only now look up which side is missing
+        if not await session.get(Hero, hero_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Hero not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
         )
-    hero.team_id = team_id
     await session.commit()
-    await session.refresh(hero)
+    cache.invalidate(session, ("hero", hero_id), ("team", team_id))
     return hero
 
 
-@router.delete("/{hero_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{hero_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[query_budget(4)]
+)
 async def delete_hero(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     hero_id: Annotated[uuid.UUID, Path()],
 ) -> None:
     hero = await session.get(Hero, hero_id)
@@ -112,3 +490,4 @@ async def delete_hero(
         )
     await session.delete(hero)
     await session.commit()
+    cache.invalidate(session, ("hero", hero_id))
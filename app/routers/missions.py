@@ -1,43 +1,592 @@
 import uuid
+from collections.abc import Sequence
 from typing import Annotated
 
-from fastapi import APIRouter, Body, HTTPException, Path, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import distinct, exists, literal, tuple_
+from sqlmodel import col, delete, func, insert, select, update
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.deps import SessionDep
+from app import bulk, conditional, export, loading, pagination
+from app.core import cache
+from app.core.budget import query_budget
+from app.core.cache import (
+    STATS_ID,
+    CacheEntry,
+    response_cache,
+    single_flight,
+    stats_cache,
+)
+from app.deps import ReadSessionDep, WriteSessionDep
+from app.loaders import IdsQuery, MissionLoaderDep, ids_alone
 from app.models import (
+    BulkResult,
     Hero,
+    HeroMissionAssignment,
     HeroMissionLink,
+    HeroPublic,
     Mission,
+    MissionBulkUpdate,
     MissionCreate,
+    MissionLookup,
     MissionPublic,
     MissionPublicWithHeroes,
+    MissionPublicWithHeroPreview,
+    MissionStats,
     MissionUpdate,
+    RosterChange,
 )
 
 router = APIRouter(prefix="/missions", tags=["missions"])
 
+HeroCursor = TypeAdapter(tuple[uuid.UUID])
+MissionCursor = TypeAdapter(tuple[uuid.UUID])
+
+# Every id is bound as its own parameter, and SQLite binds at most 32766 in one
+# statement
+RosterBody = Annotated[list[uuid.UUID], Body(max_length=32_000)]
+
+
+async def roster_mission(session: WriteSessionDep, mission_id: uuid.UUID) -> bool:
+    """Whether the mission is active, raising a 404 if it doesn't exist."""
+    found = await session.exec(
+        select(Mission.active).where(col(Mission.id) == mission_id)
+    )
+    active = found.one_or_none()
+    if active is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
+        )
+    return active
+
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=MissionPublic)
+async def add_to_roster(
+    session: WriteSessionDep, mission_id: uuid.UUID, hero_ids: list[uuid.UUID]
+) -> RosterChange:
+    # Links every hero that exists and isn't on the roster yet in one statement
+    on_roster = exists().where(
+        col(HeroMissionLink.hero_id) == col(Hero.id),
+        col(HeroMissionLink.mission_id) == mission_id,
+    )
+    result = await session.exec(
+        insert(HeroMissionLink)
+        .from_select(
+            ["hero_id", "mission_id"],
+            select(
+                col(Hero.id),
+                literal(mission_id, col(HeroMissionLink.mission_id).type),
+            ).where(col(Hero.id).in_(hero_ids), ~on_roster),
+        )
+        .returning(col(HeroMissionLink.hero_id))
+    )
+    added = list(result.scalars())
+    rest = set(hero_ids).difference(added)
+    if not rest:
+        return RosterChange(added=added)
+    # The rest are on the roster already, or don't exist
+    found = await session.exec(select(Hero.id).where(col(Hero.id).in_(rest)))
+    missing = rest.difference(found.all())
+    return RosterChange(
+        added=added,
+        not_found=list(dict.fromkeys(id for id in hero_ids if id in missing)),
+    )
+
+
+def assignment_keys(
+    links: list[tuple[uuid.UUID, uuid.UUID]],
+) -> set[cache.CacheKey]:
+    """Cache keys of both sides of changed hero-mission links."""
+    return {("hero", hero_id) for hero_id, _ in links} | {
+        ("mission", mission_id) for _, mission_id in links
+    }
+
+
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=MissionPublic,
+    dependencies=[query_budget(1)],
+)
 async def create_mission(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     mission: Annotated[MissionCreate, Body()],
 ) -> Mission:
     db_mission = Mission.model_validate(mission)
     session.add(db_mission)
     await session.commit()
-    await session.refresh(db_mission)
     return db_mission
 
 
-@router.post("/{mission_id}/heroes/{hero_id}", response_model=MissionPublicWithHeroes)
+@router.post(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def create_missions(
+    *,
+    session: WriteSessionDep,
+    missions: Annotated[list[MissionCreate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    db_missions = [Mission.model_validate(mission) for mission in missions]
+    for chunk in bulk.chunks(db_missions, chunk_size):
+        await session.exec(
+            insert(Mission), params=[mission.model_dump() for mission in chunk]
+        )
+    await session.commit()
+    return [
+        BulkResult(index=index, id=mission.id, status=status.HTTP_201_CREATED)
+        for index, mission in enumerate(db_missions)
+    ]
+
+
+@router.patch(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def update_missions(
+    *,
+    session: WriteSessionDep,
+    missions: Annotated[list[MissionBulkUpdate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    results: list[BulkResult] = []
+    for chunk in bulk.chunks(list(enumerate(missions)), chunk_size):
+        ids = [mission.id for _, mission in chunk]
+        existing = await session.exec(
+            select(Mission.id, Mission.version).where(col(Mission.id).in_(ids))
+        )
+        found = dict(existing.all())
+        params = [
+            mission.model_dump(exclude_unset=True)
+            | {"id": mission.id, "version": found[mission.id] + 1}
+            for _, mission in chunk
+            if mission.id in found
+        ]
+        if params:
+            await session.exec(update(Mission), params=params)
+        results.extend(
+            BulkResult(index=index, id=mission.id, status=status.HTTP_200_OK)
+            if mission.id in found
+            else BulkResult(
+                index=index,
+                id=mission.id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Mission not found",
+            )
+            for index, mission in chunk
+        )
+    await session.commit()
+    cache.invalidate(
+        session,
+        *(
+            ("mission", result.id)
+            for result in results
+            if result.id and result.status == status.HTTP_200_OK
+        ),
+    )
+    return results
+
+
+@router.delete(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def delete_missions(
+    *,
+    session: WriteSessionDep,
+    mission_ids: Annotated[list[uuid.UUID], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    deleted: set[uuid.UUID] = set()
+    for chunk in bulk.chunks(mission_ids, chunk_size):
+        await session.exec(
+            delete(HeroMissionLink).where(col(HeroMissionLink.mission_id).in_(chunk))
+        )
+        result = await session.exec(
+            delete(Mission).where(col(Mission.id).in_(chunk)).returning(col(Mission.id))
+        )
+        deleted.update(result.scalars())
+    await session.commit()
+    cache.invalidate(session, *(("mission", mission_id) for mission_id in deleted))
+    return [
+        BulkResult(index=index, id=mission_id, status=status.HTTP_204_NO_CONTENT)
+        if mission_id in deleted
+        else BulkResult(
+            index=index,
+            id=mission_id,
+            status=status.HTTP_404_NOT_FOUND,
+            detail="Mission not found",
+        )
+        for index, mission_id in enumerate(mission_ids)
+    ]
+
+
+@router.post(
+    "/assignments/bulk",
+    response_model=list[BulkResult],
+    dependencies=[query_budget(chunked=True)],
+)
+async def assign_heroes_to_missions(
+    *,
+    session: WriteSessionDep,
+    assignments: Annotated[list[HeroMissionAssignment], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    results: list[BulkResult] = []
+    changed: list[tuple[uuid.UUID, uuid.UUID]] = []
+    for chunk in bulk.chunks(list(enumerate(assignments)), chunk_size):
+        mission_ids = {assignment.mission_id for _, assignment in chunk}
+        hero_ids = {assignment.hero_id for _, assignment in chunk}
+        found_missions = await session.exec(
+            select(Mission.id).where(col(Mission.id).in_(mission_ids))
+        )
+        missions = set(found_missions.all())
+        found_heroes = await session.exec(
+            select(Hero.id).where(col(Hero.id).in_(hero_ids))
+        )
+        heroes = set(found_heroes.all())
+        found_links = await session.exec(
+            select(HeroMissionLink.hero_id, HeroMissionLink.mission_id).where(
+                col(HeroMissionLink.hero_id).in_(hero_ids),
+                col(HeroMissionLink.mission_id).in_(mission_ids),
+            )
+        )
+        links = set(found_links.all())
+        params: list[dict[str, uuid.UUID]] = []
+        for index, assignment in chunk:
+            link = (assignment.hero_id, assignment.mission_id)
+            if assignment.mission_id not in missions:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_404_NOT_FOUND,
+                    detail="Mission not found",
+                )
+            elif assignment.hero_id not in heroes:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_404_NOT_FOUND,
+                    detail="Hero not found",
+                )
+            elif link in links:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    detail="Hero already assigned to mission",
+                )
+            else:
+                links.add(link)
+                params.append(assignment.model_dump())
+                result = BulkResult(index=index, status=status.HTTP_201_CREATED)
+            results.append(result)
+        if params:
+            await session.exec(insert(HeroMissionLink), params=params)
+            changed.extend((link["hero_id"], link["mission_id"]) for link in params)
+    await session.commit()
+    cache.invalidate(session, *assignment_keys(changed))
+    return results
+
+
+@router.delete(
+    "/assignments/bulk",
+    response_model=list[BulkResult],
+    dependencies=[query_budget(chunked=True)],
+)
+async def remove_heroes_from_missions(
+    *,
+    session: WriteSessionDep,
+    assignments: Annotated[list[HeroMissionAssignment], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    results: list[BulkResult] = []
+    changed: list[tuple[uuid.UUID, uuid.UUID]] = []
+    for chunk in bulk.chunks(list(enumerate(assignments)), chunk_size):
+        mission_ids = {assignment.mission_id for _, assignment in chunk}
+        hero_ids = {assignment.hero_id for _, assignment in chunk}
+        found_missions = await session.exec(
+            select(Mission.id, Mission.active).where(col(Mission.id).in_(mission_ids))
+        )
+        missions = dict(found_missions.all())
+        found_heroes = await session.exec(
+            select(Hero.id).where(col(Hero.id).in_(hero_ids))
+        )
+        heroes = set(found_heroes.all())
+        found_links = await session.exec(
+            select(HeroMissionLink.hero_id, HeroMissionLink.mission_id).where(
+                col(HeroMissionLink.hero_id).in_(hero_ids),
+                col(HeroMissionLink.mission_id).in_(mission_ids),
+            )
+        )
+        links = set(found_links.all())
+        removed: list[tuple[uuid.UUID, uuid.UUID]] = []
+        for index, assignment in chunk:
+            link = (assignment.hero_id, assignment.mission_id)
+            if assignment.mission_id not in missions:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_404_NOT_FOUND,
+                    detail="Mission not found",
+                )
+            elif not missions[assignment.mission_id]:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    detail="Can't remove hero from inactive mission",
+                )
+            elif assignment.hero_id not in heroes:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_404_NOT_FOUND,
+                    detail="Hero not found",
+                )
+            elif link not in links:
+                result = BulkResult(
+                    index=index,
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    detail="Hero wasn't assigned to mission",
+                )
+            else:
+                links.remove(link)
+                removed.append(link)
+                result = BulkResult(index=index, status=status.HTTP_204_NO_CONTENT)
+            results.append(result)
+        if removed:
+            await session.exec(
+                delete(HeroMissionLink).where(
+                    tuple_(HeroMissionLink.hero_id, HeroMissionLink.mission_id).in_(
+                        removed
+                    )
+                )
+            )
+            changed.extend(removed)
+    await session.commit()
+    cache.invalidate(session, *assignment_keys(changed))
+    return results
+
+
+# A page is 1 statement, resolving `ids` 2 with the heroes' selectin load
+@router.get(
+    "/",
+    response_model=list[MissionPublic] | list[MissionLookup],
+    dependencies=[query_budget(2), Depends(ids_alone)],
+)
+async def read_missions(
+    *,
+    session: ReadSessionDep,
+    loader: MissionLoaderDep,
+    response: Response,
+    # Fetch these missions, with their heroes, instead of a page
+    ids: IdsQuery = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(gt=0)] = 100,
+    after: Annotated[str | None, Query()] = None,
+) -> Sequence[Mission] | list[MissionLookup]:
+    if ids is not None:
+        missions = await loader.load_many(ids)
+        return [
+            MissionLookup(id=mission_id, status=status.HTTP_200_OK, mission=mission)
+            if mission
+            else MissionLookup(
+                id=mission_id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Mission not found",
+            )
+            for mission_id, mission in zip(ids, missions, strict=True)
+        ]
+    # Ids are UUIDv7, so the primary key pages missions in creation order
+    query = select(Mission).order_by(col(Mission.id))
+    if after is not None:
+        query = query.where(
+            pagination.seek(
+                (col(Mission.id),), pagination.decode_cursor(after, MissionCursor)
+            )
+        )
+    results = await session.exec(query.offset(offset).limit(limit + 1))
+    return pagination.trim(
+        results.all(), limit, response, lambda mission: (mission.id,)
+    )
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[query_budget(1)])
+async def export_missions(
+    *,
+    session: ReadSessionDep,
+    active: Annotated[bool | None, Query()] = None,
+) -> StreamingResponse:
+    query = select(*export.columns(Mission, MissionPublic)).order_by(col(Mission.id))
+    if active is not None:
+        query = query.where(col(Mission.active) == active)
+    return export.stream_ndjson(session, query, MissionPublic)
+
+
+@router.get("/stats", response_model=MissionStats, dependencies=[query_budget(1)])
+async def read_mission_stats(
+    *,
+    session: ReadSessionDep,
+    if_none_match: conditional.IfNoneMatchHeader = None,
+) -> Response:
+    key = ("mission_stats", STATS_ID)
+    if entry := stats_cache.get(key):
+        return conditional.respond(entry, if_none_match)
+    # One row each for active and inactive missions
+    results = await session.exec(
+        select(
+            Mission.active,
+            func.count(distinct(Mission.id)),
+            func.count(col(HeroMissionLink.hero_id)),
+            func.count(distinct(HeroMissionLink.hero_id)),
+        )
+        .outerjoin(HeroMissionLink, col(HeroMissionLink.mission_id) == col(Mission.id))
+        .group_by(col(Mission.active))
+    )
+    groups = {active: counts for active, *counts in results}
+    active = groups.get(True, [0, 0, 0])
+    inactive = groups.get(False, [0, 0, 0])
+    stats = MissionStats(
+        missions=active[0] + inactive[0],
+        active_missions=active[0],
+        assignments=active[1] + inactive[1],
+        active_assignments=active[1],
+        heroes_on_active_missions=active[2],
+    )
+    content = stats.model_dump_json().encode()
+    etag = conditional.make_etag(content)
+    entry = stats_cache.set(key, content, etag=etag)
+    return conditional.respond(entry, if_none_match)
+
+
+@router.get(
+    "/assignments/export",
+    response_class=StreamingResponse,
+    dependencies=[query_budget(1)],
+)
+async def export_assignments(
+    *,
+    session: ReadSessionDep,
+    mission_id: Annotated[uuid.UUID | None, Query()] = None,
+) -> StreamingResponse:
+    query = select(*export.columns(HeroMissionLink, HeroMissionAssignment)).order_by(
+        col(HeroMissionLink.hero_id), col(HeroMissionLink.mission_id)
+    )
+    if mission_id is not None:
+        query = query.where(col(HeroMissionLink.mission_id) == mission_id)
+    return export.stream_ndjson(session, query, HeroMissionAssignment)
+
+
+@router.post(
+    "/{mission_id}/heroes",
+    response_model=RosterChange,
+    dependencies=[query_budget(3)],
+)
+async def add_heroes_to_mission(
+    *,
+    session: WriteSessionDep,
+    mission_id: Annotated[uuid.UUID, Path()],
+    hero_ids: RosterBody,
+) -> RosterChange:
+    await roster_mission(session, mission_id)
+    change = await add_to_roster(session, mission_id, hero_ids)
+    await session.commit()
+    cache.invalidate(
+        session, *assignment_keys([(hero_id, mission_id) for hero_id in change.added])
+    )
+    return change
+
+
+@router.put(
+    "/{mission_id}/heroes",
+    response_model=RosterChange,
+    dependencies=[query_budget(4)],
+)
+async def set_mission_heroes(
+    *,
+    session: WriteSessionDep,
+    mission_id: Annotated[uuid.UUID, Path()],
+    hero_ids: RosterBody,
+) -> RosterChange:
+    if not await roster_mission(session, mission_id):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            detail="Can't remove hero from inactive mission",
+        )
+    removed = await session.exec(
+        delete(HeroMissionLink)
+        .where(
+            col(HeroMissionLink.mission_id) == mission_id,
+            col(HeroMissionLink.hero_id).not_in(hero_ids),
+        )
+        .returning(col(HeroMissionLink.hero_id))
+    )
+    change = await add_to_roster(session, mission_id, hero_ids)
+    change.removed = list(removed.scalars())
+    await session.commit()
+    cache.invalidate(
+        session,
+        *assignment_keys(
+            [(hero_id, mission_id) for hero_id in change.added + change.removed]
+        ),
+    )
+    return change
+
+
+@router.delete(
+    "/{mission_id}/heroes",
+    response_model=RosterChange,
+    dependencies=[query_budget(2)],
+)
+async def remove_heroes_from_mission(
+    *,
+    session: WriteSessionDep,
+    mission_id: Annotated[uuid.UUID, Path()],
+    hero_ids: RosterBody,
+) -> RosterChange:
+    if not await roster_mission(session, mission_id):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            detail="Can't remove hero from inactive mission",
+        )
+    removed = await session.exec(
+        delete(HeroMissionLink)
+        .where(
+            col(HeroMissionLink.mission_id) == mission_id,
+            col(HeroMissionLink.hero_id).in_(hero_ids),
+        )
+        .returning(col(HeroMissionLink.hero_id))
+    )
+    change = RosterChange(removed=list(removed.scalars()))
+    await session.commit()
+    cache.invalidate(
+        session,
+        *assignment_keys([(hero_id, mission_id) for hero_id in change.removed]),
+    )
+    return change
+
+
+@router.post(
+    "/{mission_id}/heroes/{hero_id}",
+    response_model=MissionPublicWithHeroes,
+    dependencies=[query_budget(6)],
+)
 async def assign_hero_to_mission(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     mission_id: Annotated[uuid.UUID, Path()],
     hero_id: Annotated[uuid.UUID, Path()],
 ) -> Mission:
-    mission = await session.get(Mission, mission_id)
+    mission = await session.get(
+        Mission,
+        mission_id,
+        options=loading.MISSION_WITH_HEROES,
+        populate_existing=True,
+    )
     if not mission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
@@ -55,48 +604,181 @@ async def assign_hero_to_mission(
     hero_mission_link = HeroMissionLink(hero_id=hero_id, mission_id=mission_id)
     session.add(hero_mission_link)
     await session.commit()
-    await session.refresh(mission)
-    return mission
+    cache.invalidate(session, *assignment_keys([(hero_id, mission_id)]))
+    return await session.get_one(
+        Mission,
+        mission_id,
+        options=loading.MISSION_WITH_HEROES,
+        populate_existing=True,
+    )
 
 
-@router.get("/{mission_id}", response_model=MissionPublicWithHeroes)
-async def read_mission(
+def mission_heroes(mission_id: uuid.UUID) -> SelectOfScalar[Hero]:
+    """The mission's heroes, in the order of its (mission_id, hero_id) index."""
+    return (
+        select(Hero)
+        .join(HeroMissionLink, col(HeroMissionLink.hero_id) == col(Hero.id))
+        .where(col(HeroMissionLink.mission_id) == mission_id)
+        .order_by(col(HeroMissionLink.hero_id))
+    )
+
+
+async def read_mission_preview(
+    session: ReadSessionDep, mission_id: uuid.UUID, preview: int
+) -> Response:
+    hero_count = (
+        select(func.count())
+        .select_from(HeroMissionLink)
+        .where(col(HeroMissionLink.mission_id) == col(Mission.id))
+        .scalar_subquery()
+    )
+    found = await session.exec(
+        select(Mission, hero_count).where(col(Mission.id) == mission_id)
+    )
+    row = found.one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
+        )
+    mission, count = row
+    heroes = await session.exec(mission_heroes(mission_id).limit(preview))
+    content = MissionPublicWithHeroPreview(
+        **MissionPublic.model_validate(mission).model_dump(),
+        heroes=[HeroPublic.model_validate(hero) for hero in heroes],
+        hero_count=count,
+    ).model_dump_json()
+    return Response(content, media_type="application/json")
+
+
+@router.get(
+    "/{mission_id}/heroes",
+    response_model=list[HeroPublic],
+    dependencies=[query_budget(2)],
+)
+async def read_mission_heroes(
     *,
-    session: SessionDep,
+    session: ReadSessionDep,
+    response: Response,
     mission_id: Annotated[uuid.UUID, Path()],
-) -> Mission:
-    mission = await session.get(Mission, mission_id)
-    if not mission:
+    limit: Annotated[int, Query(gt=0)] = 100,
+    after: Annotated[str | None, Query()] = None,
+) -> Sequence[Hero]:
+    query = mission_heroes(mission_id)
+    if after is not None:
+        query = query.where(
+            pagination.seek(
+                [col(HeroMissionLink.hero_id)],
+                pagination.decode_cursor(after, HeroCursor),
+            )
+        )
+    results = await session.exec(query.limit(limit + 1))
+    heroes = results.all()
+    if not heroes and not await session.get(Mission, mission_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
         )
-    return mission
+    return pagination.trim(heroes, limit, response, lambda hero: [hero.id])
+
+
+@router.get(
+    "/{mission_id}",
+    response_model=MissionPublicWithHeroes | MissionPublicWithHeroPreview,
+    dependencies=[query_budget(3)],
+)
+async def read_mission(
+    *,
+    session: ReadSessionDep,
+    mission_id: Annotated[uuid.UUID, Path()],
+    if_none_match: conditional.IfNoneMatchHeader = None,
+    # Embed only the first `preview` heroes, and the count of all of them
+    preview: Annotated[int | None, Query(gt=0)] = None,
+) -> Response:
+    if preview is not None:
+        return await read_mission_preview(session, mission_id, preview)
+    key = ("mission", mission_id)
+    if entry := response_cache.get(key):
+        return conditional.respond(entry, if_none_match)
+    if if_none_match is not None:
+        current = await conditional.current_mission(session, mission_id)
+        if current and conditional.matches(if_none_match, current.etag, weak=True):
+            return conditional.not_modified(current.etag, if_none_match)
+    token = response_cache.token()
+
+    async def load() -> CacheEntry:
+        mission = await session.get(
+            Mission,
+            mission_id,
+            options=loading.MISSION_WITH_HEROES,
+            populate_existing=True,
+        )
+        if not mission:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
+            )
+        content = (
+            MissionPublicWithHeroes.model_validate(mission).model_dump_json().encode()
+        )
+        tags = [("hero", hero.id) for hero in mission.heroes]
+        etag = conditional.mission_etag(mission)
+        return response_cache.set(key, content, etag=etag, tags=tags, token=token)
+
+    entry = await single_flight.run(key, token, load)
+    return conditional.respond(entry, if_none_match)
 
 
-@router.patch("/{mission_id}", response_model=MissionPublic)
+@router.patch(
+    "/{mission_id}", response_model=MissionPublic, dependencies=[query_budget(2)]
+)
 async def update_mission(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     mission_id: Annotated[uuid.UUID, Path()],
     mission: Annotated[MissionUpdate, Body()],
+    if_match: conditional.IfMatchHeader = None,
 ) -> Mission:
-    db_mission = await session.get(Mission, mission_id)
+    mission_data = mission.model_dump(exclude_unset=True)
+    where = [col(Mission.id) == mission_id]
+    if if_match is not None:
+        current = await conditional.current_mission(session, mission_id)
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found"
+            )
+        conditional.check_if_match(if_match, current)
+        # Lost updates from a concurrent write now match no row
+        where.append(col(Mission.version) == current.version)
+    if mission_data:
+        results = await session.exec(
+            update(Mission)
+            .where(*where)
+            .values(mission_data | {"version": col(Mission.version) + 1})
+            .returning(Mission)
+        )
+        db_mission = results.scalars().one_or_none()
+    else:
+        db_mission = await session.get(Mission, mission_id)
     if not db_mission:
+        if if_match is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="ETag does not match",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="mission not found"
         )
-    mission_data = mission.model_dump(exclude_unset=True)
-    db_mission.sqlmodel_update(mission_data)
-    session.add(db_mission)
     await session.commit()
-    await session.refresh(db_mission)
+    cache.invalidate(session, ("mission", mission_id))
     return db_mission
 
 
-@router.delete("/{mission_id}/heroes/{hero_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{mission_id}/heroes/{hero_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[query_budget(4)],
+)
 async def remove_hero_from_mission(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     mission_id: Annotated[uuid.UUID, Path()],
     hero_id: Annotated[uuid.UUID, Path()],
 ) -> None:
@@ -129,3 +811,4 @@ async def remove_hero_from_mission(
         )
     await session.delete(hero_mission_link)
     await session.commit()
+    cache.invalidate(session, *assignment_keys([(hero_id, mission_id)]))
@@ -0,0 +1,30 @@
+from collections.abc import Sequence
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Query
+from sqlalchemy import Row
+
+from app import search
+from app.core.budget import query_budget
+from app.deps import ReadSessionDep
+from app.models import SearchResult
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("/", response_model=list[SearchResult], dependencies=[query_budget(1)])
+async def search_entities(
+    *,
+    session: ReadSessionDep,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    entity: Annotated[Literal["hero", "team", "mission"] | None, Query()] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(gt=0, le=100)] = 20,
+) -> Sequence[Row]:
+    match = search.match_query(q)
+    if match is None:
+        return []
+    results = await session.exec(
+        search.matches(match, entity, offset=offset, limit=limit)
+    )
+    return results.all()
@@ -2,77 +2,416 @@ import uuid
 from collections.abc import Sequence
 from typing import Annotated
 
-from fastapi import APIRouter, Body, HTTPException, Path, Query, status
-from sqlmodel import select
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlmodel import col, delete, func, insert, select, update
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.deps import SessionDep
-from app.models import Team, TeamCreate, TeamPublic, TeamPublicWithHeroes, TeamUpdate
+from app import bulk, conditional, export, loading, pagination
+from app.core import cache
+from app.core.budget import query_budget
+from app.core.cache import (
+    STATS_ID,
+    CacheEntry,
+    response_cache,
+    single_flight,
+    stats_cache,
+)
+from app.core.config import config
+from app.deps import ReadSessionDep, WriteSessionDep
+from app.loaders import IdsQuery, TeamLoaderDep, ids_alone
+from app.models import (
+    BulkResult,
+    Hero,
+    HeroPublic,
+    Team,
+    TeamBulkUpdate,
+    TeamCreate,
+    TeamLookup,
+    TeamPublic,
+    TeamPublicWithHeroes,
+    TeamPublicWithHeroPreview,
+    TeamStats,
+    TeamUpdate,
+)
+from app.serialization import RowSerializer
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
+TeamCursor = TypeAdapter(tuple[str, uuid.UUID])
+HeroCursor = TypeAdapter(tuple[str, uuid.UUID])
+TEAM_ROWS = RowSerializer(Team, TeamPublic)
+TeamStatsList = TypeAdapter(list[TeamStats])
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=TeamPublic)
+
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TeamPublic,
+    dependencies=[query_budget(1)],
+)
 async def create_team(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     team: Annotated[TeamCreate, Body()],
 ) -> Team:
     db_team = Team.model_validate(team)
     session.add(db_team)
     await session.commit()
-    await session.refresh(db_team)
     return db_team
 
 
-@router.get("/", response_model=list[TeamPublic])
+@router.post(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def create_teams(
+    *,
+    session: WriteSessionDep,
+    teams: Annotated[list[TeamCreate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    db_teams = [Team.model_validate(team) for team in teams]
+    for chunk in bulk.chunks(db_teams, chunk_size):
+        await session.exec(insert(Team), params=[team.model_dump() for team in chunk])
+    await session.commit()
+    return [
+        BulkResult(index=index, id=team.id, status=status.HTTP_201_CREATED)
+        for index, team in enumerate(db_teams)
+    ]
+
+
+@router.patch(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def update_teams(
+    *,
+    session: WriteSessionDep,
+    teams: Annotated[list[TeamBulkUpdate], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    results: list[BulkResult] = []
+    for chunk in bulk.chunks(list(enumerate(teams)), chunk_size):
+        ids = [team.id for _, team in chunk]
+        existing = await session.exec(
+            select(Team.id, Team.version).where(col(Team.id).in_(ids))
+        )
+        found = dict(existing.all())
+        params = [
+            team.model_dump(exclude_unset=True)
+            | {"id": team.id, "version": found[team.id] + 1}
+            for _, team in chunk
+            if team.id in found
+        ]
+        if params:
+            await session.exec(update(Team), params=params)
+        results.extend(
+            BulkResult(index=index, id=team.id, status=status.HTTP_200_OK)
+            if team.id in found
+            else BulkResult(
+                index=index,
+                id=team.id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Team not found",
+            )
+            for index, team in chunk
+        )
+    await session.commit()
+    cache.invalidate(
+        session,
+        *(
+            ("team", result.id)
+            for result in results
+            if result.id and result.status == status.HTTP_200_OK
+        ),
+    )
+    return results
+
+
+@router.delete(
+    "/bulk", response_model=list[BulkResult], dependencies=[query_budget(chunked=True)]
+)
+async def delete_teams(
+    *,
+    session: WriteSessionDep,
+    team_ids: Annotated[list[uuid.UUID], Body()],
+    chunk_size: bulk.ChunkSizeQuery = None,
+) -> list[BulkResult]:
+    deleted: set[uuid.UUID] = set()
+    detached: set[uuid.UUID] = set()
+    for chunk in bulk.chunks(team_ids, chunk_size):
+        heroes = await session.exec(
+            update(Hero)
+            .where(col(Hero.team_id).in_(chunk))
+            .values(team_id=None, version=col(Hero.version) + 1)
+            .returning(col(Hero.id))
+        )
+        detached.update(heroes.scalars())
+        result = await session.exec(
+            delete(Team).where(col(Team.id).in_(chunk)).returning(col(Team.id))
+        )
+        deleted.update(result.scalars())
+    await session.commit()
+    cache.invalidate(
+        session,
+        *(("team", team_id) for team_id in deleted),
+        *(("hero", hero_id) for hero_id in detached),
+    )
+    return [
+        BulkResult(index=index, id=team_id, status=status.HTTP_204_NO_CONTENT)
+        if team_id in deleted
+        else BulkResult(
+            index=index,
+            id=team_id,
+            status=status.HTTP_404_NOT_FOUND,
+            detail="Team not found",
+        )
+        for index, team_id in enumerate(team_ids)
+    ]
+
+
+# A page is 1 statement, resolving `ids` 2 with the heroes' selectin load
+@router.get(
+    "/",
+    response_model=list[TeamPublic] | list[TeamLookup],
+    dependencies=[query_budget(2), Depends(ids_alone)],
+)
 async def read_teams(
     *,
-    session: SessionDep,
+    session: ReadSessionDep,
+    loader: TeamLoaderDep,
+    response: Response,
+    # Fetch these teams, with their heroes, instead of a page
+    ids: IdsQuery = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(gt=0)] = 100,
-) -> Sequence[Team]:
-    results = await session.exec(select(Team).offset(offset).limit(limit))
-    return results.all()
+    after: Annotated[str | None, Query()] = None,
+) -> Sequence[Team] | list[TeamLookup] | Response:
+    if ids is not None:
+        teams = await loader.load_many(ids)
+        return [
+            TeamLookup(id=team_id, status=status.HTTP_200_OK, team=team)
+            if team
+            else TeamLookup(
+                id=team_id, status=status.HTTP_404_NOT_FOUND, detail="Team not found"
+            )
+            for team_id, team in zip(ids, teams, strict=True)
+        ]
+    sort_key = (Team.name, Team.id)
+    query = select(*TEAM_ROWS.columns) if config.fast_responses else select(Team)
+    query = query.order_by(*sort_key)
+    if after is not None:
+        query = query.where(
+            pagination.seek(sort_key, pagination.decode_cursor(after, TeamCursor))
+        )
+    results = await session.exec(query.offset(offset).limit(limit + 1))
+    teams = results.all()
+    if len(teams) > limit:
+        teams = teams[:limit]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(
+            teams[-1].name, teams[-1].id
+        )
+    if config.fast_responses:
+        return TEAM_ROWS.response(teams, response.headers)
+    return teams
 
 
-@router.get("/{team_id}", response_model=TeamPublicWithHeroes)
-async def read_team(
+@router.get("/export", response_class=StreamingResponse, dependencies=[query_budget(1)])
+async def export_teams(*, session: ReadSessionDep) -> StreamingResponse:
+    query = select(*export.columns(Team, TeamPublic)).order_by(col(Team.id))
+    return export.stream_ndjson(session, query, TeamPublic)
+
+
+@router.get("/stats", response_model=list[TeamStats], dependencies=[query_budget(1)])
+async def read_team_stats(
+    *,
+    session: ReadSessionDep,
+    if_none_match: conditional.IfNoneMatchHeader = None,
+) -> Response:
+    key = ("team_stats", STATS_ID)
+    if entry := stats_cache.get(key):
+        return conditional.respond(entry, if_none_match)
+    # Each team's heroes are found through the hero.team_id index
+    results = await session.exec(
+        select(Team.id, Team.name, func.count(col(Hero.id)), func.avg(Hero.age))
+        .outerjoin(Hero, col(Hero.team_id) == col(Team.id))
+        .group_by(col(Team.id))
+        .order_by(col(Team.name), col(Team.id))
+    )
+    content = TeamStatsList.dump_json(
+        [
+            TeamStats(id=id, name=name, heroes=heroes, average_age=average_age)
+            for id, name, heroes, average_age in results
+        ]
+    )
+    etag = conditional.make_etag(content)
+    entry = stats_cache.set(key, content, etag=etag)
+    return conditional.respond(entry, if_none_match)
+
+
+def team_heroes(team_id: uuid.UUID) -> SelectOfScalar[Hero]:
+    """The team's heroes by (name, id), in the order of their team index."""
+    return (
+        select(Hero)
+        .where(col(Hero.team_id) == team_id)
+        .order_by(col(Hero.name), col(Hero.id))
+    )
+
+
+async def read_team_preview(
+    session: ReadSessionDep, team_id: uuid.UUID, preview: int
+) -> Response:
+    hero_count = (
+        select(func.count())
+        .select_from(Hero)
+        .where(col(Hero.team_id) == col(Team.id))
+        .scalar_subquery()
+    )
+    found = await session.exec(select(Team, hero_count).where(col(Team.id) == team_id))
+    row = found.one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
+        )
+    team, count = row
+    heroes = await session.exec(team_heroes(team_id).limit(preview))
+    content = TeamPublicWithHeroPreview(
+        **TeamPublic.model_validate(team).model_dump(),
+        heroes=[HeroPublic.model_validate(hero) for hero in heroes],
+        hero_count=count,
+    ).model_dump_json()
+    return Response(content, media_type="application/json")
+
+
+@router.get(
+    "/{team_id}/heroes",
+    response_model=list[HeroPublic],
+    dependencies=[query_budget(2)],
+)
+async def read_team_heroes(
     *,
-    session: SessionDep,
+    session: ReadSessionDep,
+    response: Response,
     team_id: Annotated[uuid.UUID, Path()],
-) -> Team:
-    team = await session.get(Team, team_id)
-    if not team:
+    limit: Annotated[int, Query(gt=0)] = 100,
+    after: Annotated[str | None, Query()] = None,
+) -> Sequence[Hero]:
+    query = team_heroes(team_id)
+    if after is not None:
+        query = query.where(
+            pagination.seek(
+                (col(Hero.name), col(Hero.id)),
+                pagination.decode_cursor(after, HeroCursor),
+            )
+        )
+    results = await session.exec(query.limit(limit + 1))
+    heroes = results.all()
+    if not heroes and not await session.get(Team, team_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
         )
-    return team
+    return pagination.trim(heroes, limit, response, lambda hero: [hero.name, hero.id])
 
 
-@router.patch("/{team_id}", response_model=TeamPublic)
+@router.get(
+    "/{team_id}",
+    response_model=TeamPublicWithHeroes | TeamPublicWithHeroPreview,
+    dependencies=[query_budget(3)],
+)
+async def read_team(
+    *,
+    session: ReadSessionDep,
+    team_id: Annotated[uuid.UUID, Path()],
+    if_none_match: conditional.IfNoneMatchHeader = None,
+    # Embed only the first `preview` heroes, and the count of all of them
+    preview: Annotated[int | None, Query(gt=0)] = None,
+) -> Response:
+    if preview is not None:
+        return await read_team_preview(session, team_id, preview)
+    key = ("team", team_id)
+    if entry := response_cache.get(key):
+        return conditional.respond(entry, if_none_match)
+    if if_none_match is not None:
+        current = await conditional.current_team(session, team_id)
+        if current and conditional.matches(if_none_match, current.etag, weak=True):
+            return conditional.not_modified(current.etag, if_none_match)
+    token = response_cache.token()
+
+    async def load() -> CacheEntry:
+        team = await session.get(
+            Team, team_id, options=loading.TEAM_WITH_HEROES, populate_existing=True
+        )
+        if not team:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
+            )
+        content = TeamPublicWithHeroes.model_validate(team).model_dump_json().encode()
+        tags = [("hero", hero.id) for hero in team.heroes]
+        etag = conditional.team_etag(team)
+        return response_cache.set(key, content, etag=etag, tags=tags, token=token)
+
+    entry = await single_flight.run(key, token, load)
+    return conditional.respond(entry, if_none_match)
+
+
+@router.patch("/{team_id}", response_model=TeamPublic, dependencies=[query_budget(2)])
 async def update_team(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     team_id: Annotated[uuid.UUID, Path()],
     team: Annotated[TeamUpdate, Body()],
+    if_match: conditional.IfMatchHeader = None,
 ) -> Team:
-    db_team = await session.get(Team, team_id)
+    team_data = team.model_dump(exclude_unset=True)
+    where = [col(Team.id) == team_id]
+    if if_match is not None:
+        current = await conditional.current_team(session, team_id)
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
+            )
+        conditional.check_if_match(if_match, current)
+        # Lost updates from a concurrent write now match no row
+        where.append(col(Team.version) == current.version)
+    if team_data:
+        results = await session.exec(
+            update(Team)
+            .where(*where)
+            .values(team_data | {"version": col(Team.version) + 1})
+            .returning(Team)
+        )
+        db_team = results.scalars().one_or_none()
+    else:
+        db_team = await session.get(Team, team_id)
     if not db_team:
+        if if_match is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="ETag does not match",
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
         )
-    team_data = team.model_dump(exclude_unset=True)
-    db_team.sqlmodel_update(team_data)
-    session.add(db_team)
     await session.commit()
-    await session.refresh(db_team)
+    cache.invalidate(session, ("team", team_id))
     return db_team
 
 
-@router.delete("/{team_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{team_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[query_budget(4)]
+)
 async def delete_team(
     *,
-    session: SessionDep,
+    session: WriteSessionDep,
     team_id: Annotated[uuid.UUID, Path()],
 ) -> None:
     team = await session.get(Team, team_id)
@@ -80,5 +419,17 @@ async def delete_team(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Team not found"
         )
+    # Detach the heroes here rather than through the relationship cascade, so
+    # their versions are bumped with it
+    heroes = await session.exec(
+        update(Hero)
+        .where(col(Hero.team_id) == team_id)
+        .values(team_id=None, version=col(Hero.version) + 1)
+        .returning(col(Hero.id))
+    )
+    detached = heroes.scalars().all()
     await session.delete(team)
     await session.commit()
+    cache.invalidate(
+        session, ("team", team_id), *(("hero", hero_id) for hero_id in detached)
+    )
@@ -0,0 +1,105 @@
+"""Full-text search over heroes, teams and missions, on SQLite FTS5.
+
+Every searchable row gets a `SearchDocument`, whose integer `docid` is the
+rowid of its entry in its entity's FTS5 table, `searchindex_hero` and so on.
+Triggers on the entity tables keep both in step with every insert, update and
+delete, bulk writes included. Only the Alembic migration creates them, the
+models don't describe them, so `create_all` alone builds no search index. A
+batch migration that rebuilds an entity table drops its triggers along with it,
+so it has to create them again.
+"""
+
+from sqlalchemy import (
+    Integer,
+    String,
+    TableClause,
+    column,
+    literal,
+    literal_column,
+    table,
+    union_all,
+)
+from sqlmodel import col, func, select
+from sqlmodel.sql.expression import Select
+
+from app.models import SearchDocument
+
+SEARCH_TABLE_PREFIX = "searchindex_"
+
+# The title and body columns each entity is indexed on
+SOURCES: dict[str, tuple[str, str | None]] = {
+    "hero": ("name", "secret_name"),
+    "team": ("name", "headquarters"),
+    "mission": ("description", None),
+}
+# bm25 weights of the title and body columns
+WEIGHTS = (10.0, 1.0)
+
+# Each entity has its own index, so searching one entity never reads the
+# matches of the others
+indexes: dict[str, TableClause] = {
+    entity: table(
+        f"{SEARCH_TABLE_PREFIX}{entity}",
+        column("rowid", Integer),
+        column("title", String),
+    )
+    for entity in SOURCES
+}
+
+
+def match_query(q: str) -> str | None:
+    """Turns free text into an FTS5 query matching rows with all of its terms.
+
+    Terms are quoted, so FTS5 operators and punctuation in `q` can't make the
+    query invalid. Returns None when `q` has no terms.
+    """
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in q.split()]
+    return " ".join(terms) or None
+
+
+def ranked(entity: str, match: str, depth: int) -> Select:
+    """Selects the `depth` best matches of one entity."""
+    index = indexes[entity]
+    rank = func.bm25(literal_column(index.name), *WEIGHTS)
+    # Every match is scored, but SQLite only keeps the best `depth` of them
+    # while sorting
+    best = (
+        select(
+            literal(entity).label("entity"),
+            index.c.rowid.label("docid"),
+            index.c.title,
+            rank.label("rank"),
+        )
+        .where(literal_column(index.name).match(match))
+        .order_by(rank)
+        .limit(depth)
+        .subquery()
+    )
+    return select(best)
+
+
+def matches(
+    match: str, entity: str | None = None, *, offset: int, limit: int
+) -> Select:
+    """Selects a page of the documents matching the FTS5 query `match`, best first.
+
+    Every match is ranked with bm25. A page can only hold matches among the
+    best `offset + limit` of each entity, so only those are merged and looked
+    up, however many rows match.
+    """
+    entities = list(SOURCES) if entity is None else [entity]
+    found = union_all(
+        *(ranked(name, match, offset + limit) for name in entities)
+    ).subquery()
+    return (
+        select(
+            found.c.entity,
+            col(SearchDocument.entity_id).label("id"),
+            found.c.title,
+            found.c.rank,
+        )
+        .join(SearchDocument, col(SearchDocument.docid) == found.c.docid)
+        .order_by(found.c.rank)
+        .offset(offset)
+        .limit(limit)
+    )
@@ -0,0 +1,36 @@
+from collections.abc import Sequence
+from typing import Any, TypedDict
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlmodel import SQLModel
+from starlette.datastructures import MutableHeaders
+
+from app import export
+
+
+class RowSerializer:
+    """Serializes selected rows straight to JSON in the shape of a public model.
+
+    The public model's fields are rebuilt as a TypedDict once, so its compiled
+    pydantic-core serializer writes plain row dicts without constructing or
+    validating a model instance per row, the work `response_model` does.
+    """
+
+    def __init__(self, table: type[SQLModel], public: type[SQLModel]) -> None:
+        self.columns = export.columns(table, public)
+        row = TypedDict(
+            f"{public.__name__}Row",
+            {name: field.annotation for name, field in public.model_fields.items()},
+        )
+        self._adapter: TypeAdapter[list[Any]] = TypeAdapter(list[row])
+
+    def dump_json(self, rows: Sequence[Row[Any]]) -> bytes:
+        return self._adapter.dump_json([row._asdict() for row in rows])
+
+    def response(self, rows: Sequence[Row[Any]], headers: MutableHeaders) -> Response:
+        """The JSON response for `rows`, keeping headers set on the route's response."""
+        return Response(
+            self.dump_json(rows), media_type="application/json", headers=dict(headers)
+        )
@@ -0,0 +1,316 @@
+"""API load benchmark.
+
+Seeds a file-backed SQLite database, then drives every endpoint of the
+routers through the ASGI app at each concurrency level and reports
+throughput, p50/p95/p99 latency and SQL statements per request.
+
+    uv run python -m benchmarks.load --output baseline.json
+    uv run python -m benchmarks.load --baseline baseline.json
+
+The app runs with its real engines and writer, configured from the
+environment as usual (e.g. CACHE_ENABLED=false to measure uncached reads).
+With `--baseline`, the run is compared against an earlier `--output` file and
+exits non-zero when p99 latency, throughput or statements per request regress
+by more than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import create_engine, event
+from sqlmodel import insert
+
+
+@dataclass
+class Seed:
+    teams: list[uuid.UUID]
+    heroes: list[uuid.UUID]
+    missions: list[uuid.UUID]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: Callable[[random.Random], str]
+    body: Callable[[random.Random], Any] | None = None
+
+
+def seed_database(
+    url: str, *, teams: int, heroes: int, missions: int, links: int, rng: random.Random
+) -> Seed:
+    from app.core import db
+    from app.models import Hero, HeroMissionLink, Mission, Team
+
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            db.migrate(conn)
+        db_teams = [
+            Team(name=f"Team {i}", headquarters=f"Tower {i}") for i in range(teams)
+        ]
+        db_heroes = [
+            Hero(
+                name=f"Hero {i}",
+                secret_name=f"Secret {i}",
+                age=rng.choice([None, *range(18, 80)]),
+                team_id=rng.choice([None, *(team.id for team in db_teams)]),
+            )
+            for i in range(heroes)
+        ]
+        db_missions = [
+            Mission(description=f"Mission {i}", active=rng.random() < 0.8)
+            for i in range(missions)
+        ]
+        db_links = {
+            (rng.choice(db_heroes).id, rng.choice(db_missions).id) for _ in range(links)
+        }
+        with engine.begin() as conn:
+            for model, rows in [
+                (Team, [team.model_dump() for team in db_teams]),
+                (Hero, [hero.model_dump() for hero in db_heroes]),
+                (Mission, [mission.model_dump() for mission in db_missions]),
+                (
+                    HeroMissionLink,
+                    [
+                        {"hero_id": hero_id, "mission_id": mission_id}
+                        for hero_id, mission_id in db_links
+                    ],
+                ),
+            ]:
+                if rows:
+                    conn.execute(insert(model), rows)
+    finally:
+        engine.dispose()
+    return Seed(
+        teams=[team.id for team in db_teams],
+        heroes=[hero.id for hero in db_heroes],
+        missions=[mission.id for mission in db_missions],
+    )
+
+
+def endpoints(seed: Seed) -> list[Endpoint]:
+    def hero(rng: random.Random) -> uuid.UUID:
+        return rng.choice(seed.heroes)
+
+    def team(rng: random.Random) -> uuid.UUID:
+        return rng.choice(seed.teams)
+
+    def mission(rng: random.Random) -> uuid.UUID:
+        return rng.choice(seed.missions)
+
+    return [
+        Endpoint("read_heroes", "GET", lambda _: "/api/heroes/"),
+        Endpoint(
+            "read_heroes_filtered",
+            "GET",
+            lambda rng: f"/api/heroes/?team_id={team(rng)}&sort=-age",
+        ),
+        Endpoint("read_hero", "GET", lambda rng: f"/api/heroes/{hero(rng)}"),
+        Endpoint("read_teams", "GET", lambda _: "/api/teams/"),
+        Endpoint("read_team", "GET", lambda rng: f"/api/teams/{team(rng)}"),
+        Endpoint("read_mission", "GET", lambda rng: f"/api/missions/{mission(rng)}"),
+        Endpoint(
+            "create_hero",
+            "POST",
+            lambda _: "/api/heroes/",
+            lambda rng: {"name": f"Hero {rng.random()}", "secret_name": "Secret"},
+        ),
+        Endpoint(
+            "update_hero",
+            "PATCH",
+            lambda rng: f"/api/heroes/{hero(rng)}",
+            lambda rng: {"age": rng.randint(18, 80)},
+        ),
+        Endpoint(
+            "assign_hero_to_team",
+            "PATCH",
+            lambda rng: f"/api/heroes/{hero(rng)}/team/{team(rng)}",
+        ),
+        Endpoint(
+            "create_team",
+            "POST",
+            lambda _: "/api/teams/",
+            lambda rng: {"name": f"Team {rng.random()}", "headquarters": "Tower"},
+        ),
+        Endpoint(
+            "update_team",
+            "PATCH",
+            lambda rng: f"/api/teams/{team(rng)}",
+            lambda rng: {"headquarters": f"Tower {rng.random()}"},
+        ),
+        Endpoint(
+            "create_mission",
+            "POST",
+            lambda _: "/api/missions/",
+            lambda rng: {"description": f"Mission {rng.random()}"},
+        ),
+        Endpoint(
+            "update_mission",
+            "PATCH",
+            lambda rng: f"/api/missions/{mission(rng)}",
+            lambda rng: {"description": f"Mission {rng.random()}"},
+        ),
+        Endpoint(
+            "assign_hero_to_mission",
+            "POST",
+            lambda rng: f"/api/missions/{mission(rng)}/heroes/{hero(rng)}",
+        ),
+    ]
+
+
+async def drive(
+    client: AsyncClient,
+    endpoint: Endpoint,
+    *,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> tuple[float, list[float]]:
+    # Draw every request up front, so runs with the same seed send the same ones
+    calls = [
+        (endpoint.path(rng), endpoint.body(rng) if endpoint.body else None)
+        for _ in range(requests)
+    ]
+    latencies: list[float] = []
+
+    async def worker() -> None:
+        while calls:
+            path, body = calls.pop()
+            started = time.perf_counter()
+            r: Response = await client.request(endpoint.method, path, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            # 304s are expected, e.g. assigning a hero to a mission twice
+            if r.is_error:
+                r.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+async def run(args: argparse.Namespace, url: str) -> dict[str, dict[str, float]]:
+    from app.core import db
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    seed = seed_database(
+        url.replace("+aiosqlite", ""),
+        teams=args.teams,
+        heroes=args.heroes,
+        missions=args.missions,
+        links=args.links,
+        rng=rng,
+    )
+    statements = 0
+
+    def count(*_args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    results: dict[str, dict[str, float]] = {}
+    async with app.router.lifespan_context(app):
+        engines = {db.read_engine.sync_engine, db.write_engine.sync_engine}
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", count)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            for concurrency in args.concurrency:
+                for endpoint in endpoints(seed):
+                    statements = 0
+                    elapsed, latencies = await drive(
+                        client,
+                        endpoint,
+                        requests=args.requests,
+                        concurrency=concurrency,
+                        rng=rng,
+                    )
+                    percentiles = statistics.quantiles(latencies, n=100)
+                    results[f"{endpoint.name}@{concurrency}"] = {
+                        "throughput_rps": len(latencies) / elapsed,
+                        "p50_ms": percentiles[49],
+                        "p95_ms": percentiles[94],
+                        "p99_ms": percentiles[98],
+                        "statements_per_request": statements / len(latencies),
+                    }
+                    print(f"{endpoint.name}@{concurrency}", file=sys.stderr)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> bool:
+    ok = True
+    for key, stats in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        regressions = {
+            "p99_ms": stats["p99_ms"] > before["p99_ms"] * (1 + tolerance),
+            "throughput_rps": stats["throughput_rps"]
+            < before["throughput_rps"] * (1 - tolerance),
+            # Group commits make write counts vary a little under concurrency
+            "statements_per_request": stats["statements_per_request"]
+            > before["statements_per_request"] * (1 + tolerance),
+        }
+        for metric, regressed in regressions.items():
+            ok = ok and not regressed
+            change = (stats[metric] - before[metric]) / (before[metric] or 1)
+            print(
+                f"{key:<32} {metric:<22} {before[metric]:10.3f} -> "
+                f"{stats[metric]:10.3f} ({change:+.1%})"
+                f"{'  REGRESSION' if regressed else ''}"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--heroes", type=int, default=10_000)
+    parser.add_argument("--missions", type=int, default=1000)
+    parser.add_argument("--links", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before the app is imported, it builds its engines from it
+        url = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ["DATABASE_URL"] = url
+        results = asyncio.run(run(args, url))
+
+    artifact = {"config": vars(args) | {"output": None, "baseline": None}}
+    artifact["results"] = results
+    if args.output:
+        args.output.write_text(json.dumps(artifact, indent=2, default=str))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if not compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+    else:
+        print(json.dumps(artifact, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
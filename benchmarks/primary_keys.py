@@ -0,0 +1,115 @@
+"""Primary key layout benchmark.
+
+Bulk-inserts heroes into file-backed SQLite databases, with the app's engine
+profile, once per layout: random (UUIDv4) or time-ordered (UUIDv7) ids, with
+and without the duplicate `ix_hero_id` index the tables used to carry. Reports
+the insert rate and the database file size for each.
+
+    uv run python -m benchmarks.primary_keys --rows 500000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, event, text
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.pool import ConnectionPoolEntry
+from sqlmodel import SQLModel, insert
+
+LAYOUTS: dict[str, tuple[Callable[[], uuid.UUID], bool]] = {
+    "uuid4+id_index": (uuid.uuid4, True),
+    "uuid4": (uuid.uuid4, False),
+    "uuid7+id_index": (uuid.uuid7, True),
+    "uuid7": (uuid.uuid7, False),
+}
+
+
+def build_engine(path: Path) -> Engine:
+    from app.core.config import Settings
+    from app.core.db import sqlite_pragmas
+
+    pragmas = sqlite_pragmas(
+        Settings.model_validate({"database_url": f"sqlite:///{path}"})
+    )
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(
+        dbapi_connection: DBAPIConnection, _connection_record: ConnectionPoolEntry
+    ) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def measure(
+    path: Path,
+    new_id: Callable[[], uuid.UUID],
+    *,
+    id_index: bool,
+    rows: int,
+    batch: int,
+) -> dict[str, float]:
+    from app.models import Hero
+
+    engine = build_engine(path)
+    try:
+        SQLModel.metadata.create_all(engine)
+        if id_index:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE INDEX ix_hero_id ON hero (id)"))
+        started = time.perf_counter()
+        for start in range(0, rows, batch):
+            with engine.begin() as conn:
+                conn.execute(
+                    insert(Hero),
+                    [
+                        {
+                            "id": new_id(),
+                            "name": f"Hero {i}",
+                            "secret_name": f"Secret {i}",
+                            "age": i % 80,
+                        }
+                        for i in range(start, min(start + batch, rows))
+                    ],
+                )
+        elapsed = time.perf_counter() - started
+        with engine.begin() as conn:
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    finally:
+        engine.dispose()
+    return {"rows_per_second": rows / elapsed, "file_mib": path.stat().st_size / 2**20}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Only needed to import the app's settings, every run has its own file
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmp}/unused.db")
+        for name, (new_id, id_index) in LAYOUTS.items():
+            results[name] = measure(
+                Path(tmp) / f"{name}.db",
+                new_id,
+                id_index=id_index,
+                rows=args.rows,
+                batch=args.batch,
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Full-text search benchmark.
+
+Bulk-inserts heroes into a file-backed SQLite database, with the app's engine
+profile and its search triggers, their names drawn from a Zipf-distributed
+vocabulary so that some terms are rare and some match a large share of rows.
+Then times the first page of `GET /api/search` statements for terms of every
+frequency, across every entity and for heroes only, as the route runs them.
+Reports the match count with the median and p95 latency of each.
+
+    uv run python -m benchmarks.search --rows 2000000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, literal_column, select, text
+from sqlmodel import insert
+
+from benchmarks.primary_keys import build_engine
+
+SYLLABLES = ["ka", "ri", "mo", "zen", "tor", "vel", "shi", "dan", "lu", "bex"]
+
+
+def vocabulary(size: int) -> list[str]:
+    words = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+    return random.Random(0).sample(words, size)
+
+
+def measure(path: Path, *, rows: int, batch: int, repeat: int) -> dict[str, dict]:
+    from app import search
+    from app.core import db
+    from app.models import Hero
+
+    words = vocabulary(500)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    rng = random.Random(1)
+    engine = build_engine(path)
+    try:
+        with engine.begin() as conn:
+            db.migrate(conn)
+        for start in range(0, rows, batch):
+            names = rng.choices(words, weights, k=3 * min(batch, rows - start))
+            with engine.begin() as conn:
+                conn.execute(
+                    insert(Hero),
+                    [
+                        {
+                            "name": f"{names[3 * i]} {names[3 * i + 1]}",
+                            "secret_name": names[3 * i + 2],
+                        }
+                        for i in range(len(names) // 3)
+                    ],
+                )
+        with engine.begin() as conn:
+            # Merge the index's segments, as a long-lived database's would be
+            index = search.indexes["hero"].name
+            conn.execute(text(f"INSERT INTO {index} ({index}) VALUES ('optimize')"))
+
+        queries = {
+            "common": words[0],
+            "median": words[len(words) // 2],
+            "rare": words[-1],
+            "two terms": f"{words[0]} {words[1]}",
+        }
+        results: dict[str, dict] = {}
+        with engine.connect() as conn:
+            for name, q in queries.items():
+                match = search.match_query(q)
+                assert match is not None
+                heroes = search.indexes["hero"]
+                count = conn.execute(
+                    select(func.count())
+                    .select_from(heroes)
+                    .where(literal_column(heroes.name).match(match))
+                ).scalar_one()
+                results[name] = {"q": q, "matches": count}
+                # Every entity, as the route searches by default, and heroes only
+                for label, entity in [("all", None), ("hero", "hero")]:
+                    query = search.matches(match, entity, offset=0, limit=20)
+                    timings = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        conn.execute(query).all()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    results[name] |= {
+                        f"{label}_p50_ms": statistics.median(timings),
+                        f"{label}_p95_ms": statistics.quantiles(timings, n=20)[-1],
+                    }
+    finally:
+        engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Only needed to import the app's settings, the run has its own file
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmp}/unused.db")
+        results = measure(
+            Path(tmp) / "search.db",
+            rows=args.rows,
+            batch=args.batch,
+            repeat=args.repeat,
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""List response serialization micro-benchmark.
+
+Times `read_heroes` and `read_teams` pages through the ASGI app, once through
+the `response_model` path and once with `FAST_RESPONSES` serializing rows
+directly, and reports p50 latency per page for each path.
+
+    uv run python -m benchmarks.serialization --requests 500 --limit 100
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from collections.abc import AsyncGenerator
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def measure(client: AsyncClient, path: str, n: int, limit: int) -> float:
+    latencies: list[float] = []
+    for _ in range(n):
+        started = time.perf_counter()
+        r = await client.get(path, params={"limit": limit})
+        latencies.append((time.perf_counter() - started) * 1000)
+        r.raise_for_status()
+    return statistics.median(latencies)
+
+
+async def run(n: int, limit: int) -> dict[str, dict[str, float]]:
+    from app.core import db
+    from app.core.config import config
+    from app.deps import get_read_session
+    from app.main import app
+    from app.models import Hero, Team
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(db.migrate)
+            teams = [Team(name=f"Team {i}", headquarters="Tower") for i in range(limit)]
+            heroes = [
+                Hero(name=f"Hero {i}", secret_name="Secret", age=i, team_id=team.id)
+                for i, team in enumerate(teams)
+            ]
+            await conn.execute(insert(Team), [team.model_dump() for team in teams])
+            await conn.execute(insert(Hero), [hero.model_dump() for hero in heroes])
+
+        async def get_bench_session() -> AsyncGenerator[AsyncSession]:
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_read_session] = get_bench_session
+        results: dict[str, dict[str, float]] = {}
+        try:
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://bench"
+            ) as client:
+                for endpoint, path in [
+                    ("read_heroes", "/api/heroes/"),
+                    ("read_teams", "/api/teams/"),
+                ]:
+                    config.fast_responses = False
+                    response_model = await measure(client, path, n, limit)
+                    config.fast_responses = True
+                    fast = await measure(client, path, n, limit)
+                    results[endpoint] = {
+                        "response_model_p50_ms": response_model,
+                        "fast_p50_ms": fast,
+                        "speedup": response_model / fast,
+                    }
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.limit)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Write endpoint latency benchmark.
+
+Drives every single-item write endpoint through the ASGI app against a
+file-backed SQLite database and reports p50/p99 latency per endpoint.
+
+    uv run python -m benchmarks.write_latency --output after.json
+    uv run python -m benchmarks.write_latency --baseline before.json
+
+With `--baseline`, the run is compared against an earlier `--output` file
+(e.g. one taken on the previous commit) and exits non-zero when any p99
+regresses by more than `--tolerance`.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def measure(
+    n: int, request: Callable[[int], Awaitable[Response]]
+) -> dict[str, float]:
+    latencies: list[float] = []
+    for i in range(n):
+        started = time.perf_counter()
+        r = await request(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        r.raise_for_status()
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": percentiles[49], "p99_ms": percentiles[98]}
+
+
+async def run(n: int) -> dict[str, dict[str, float]]:
+    from app.core import db
+    from app.deps import get_read_session, get_write_session
+    from app.main import app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(db.migrate)
+
+        async def get_bench_session() -> AsyncGenerator[AsyncSession]:
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_read_session] = get_bench_session
+        app.dependency_overrides[get_write_session] = get_bench_session
+        heroes: list[uuid.UUID] = []
+        teams: list[uuid.UUID] = []
+        missions: list[uuid.UUID] = []
+
+        async def create(
+            client: AsyncClient, path: str, body: dict[str, Any], ids: list[uuid.UUID]
+        ) -> Response:
+            r = await client.post(path, json=body)
+            ids.append(uuid.UUID(r.json()["id"]))
+            return r
+
+        try:
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://bench"
+            ) as client:
+                return {
+                    "create_hero": await measure(
+                        n,
+                        lambda i: create(
+                            client,
+                            "/api/heroes/",
+                            {"name": f"Hero {i}", "secret_name": "Secret"},
+                            heroes,
+                        ),
+                    ),
+                    "create_team": await measure(
+                        n,
+                        lambda i: create(
+                            client,
+                            "/api/teams/",
+                            {"name": f"Team {i}", "headquarters": "Tower"},
+                            teams,
+                        ),
+                    ),
+                    "create_mission": await measure(
+                        n,
+                        lambda i: create(
+                            client,
+                            "/api/missions/",
+                            {"description": f"Mission {i}"},
+                            missions,
+                        ),
+                    ),
+                    "update_hero": await measure(
+                        n,
+                        lambda i: client.patch(
+                            f"/api/heroes/{heroes[i]}", json={"age": i}
+                        ),
+                    ),
+                    "update_team": await measure(
+                        n,
+                        lambda i: client.patch(
+                            f"/api/teams/{teams[i]}", json={"headquarters": f"HQ {i}"}
+                        ),
+                    ),
+                    "update_mission": await measure(
+                        n,
+                        lambda i: client.patch(
+                            f"/api/missions/{missions[i]}", json={"active": False}
+                        ),
+                    ),
+                    "assign_hero_to_team": await measure(
+                        n,
+                        lambda i: client.patch(
+                            f"/api/heroes/{heroes[i]}/team/{teams[i]}"
+                        ),
+                    ),
+                }
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> bool:
+    ok = True
+    for endpoint, stats in results.items():
+        if endpoint not in baseline:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            before, after = baseline[endpoint][metric], stats[metric]
+            change = (after - before) / before
+            regressed = metric == "p99_ms" and change > tolerance
+            ok = ok and not regressed
+            print(
+                f"{endpoint:<20} {metric} {before:8.3f} -> {after:8.3f} ms "
+                f"({change:+.1%}){'  REGRESSION' if regressed else ''}"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
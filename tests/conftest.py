@@ -1,12 +1,18 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Generator
 
+import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine
-from sqlmodel import SQLModel, StaticPool
+from sqlmodel import StaticPool
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.deps import get_session
+from app.changes import change_feed
+from app.core import budget, db, metrics
+from app.core.cache import response_cache, single_flight, stats_cache
+from app.core.config import config
+from app.deps import get_read_session, get_write_session
 from app.main import app
 
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -17,18 +23,52 @@ async def session_fixture() -> AsyncGenerator[AsyncSession]:
     engine = create_async_engine(
         DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
     )
+    metrics.instrument(engine)
+    budget.instrument(engine)
     async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-    async with AsyncSession(engine) as session:
+        await conn.run_sync(db.migrate)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
     await engine.dispose()
 
 
 @pytest_asyncio.fixture(name="client")
-async def client_fixture(session: AsyncSession) -> AsyncGenerator[AsyncClient]:
-    app.dependency_overrides[get_session] = lambda: session
+async def client_fixture(
+    session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncClient]:
+    response_cache.clear()
+    stats_cache.clear()
+    # The tests serve the app from a single process
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.hits = response_cache.misses = response_cache.evictions = 0
+    single_flight.coalesced = 0
+    change_feed.clear()
+    metrics.routes.clear()
+    # Every request the tests make is held to its route's query budget
+    monkeypatch.setattr(config, "query_budget_mode", "raise")
+    app.dependency_overrides[get_read_session] = lambda: session
+    app.dependency_overrides[get_write_session] = lambda: session
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
     ) as async_client:
         yield async_client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="statements")
+def statements_fixture(session: AsyncSession) -> Generator[list[str]]:
+    """Collects every SQL statement sent to the test database."""
+    statements: list[str] = []
+
+    def before_cursor_execute(
+        _conn: object,
+        _cursor: object,
+        statement: str,
+        *_args: object,
+    ) -> None:
+        statements.append(statement)
+
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import budget
+from app.core.config import config
+from app.models import Hero
+
+
+@pytest.mark.asyncio
+async def test_track_budget(session: AsyncSession) -> None:
+    with budget.track(2) as queries:
+        await session.exec(select(Hero))
+        await session.exec(select(Hero).where(Hero.name == "Deadpond"))
+    assert len(queries.statements) == 2
+
+    with pytest.raises(budget.QueryBudgetExceeded, match="3 statements"):
+        with budget.track(2):
+            for _ in range(3):
+                await session.exec(select(Hero).where(Hero.age == 1))
+
+
+@pytest.mark.asyncio
+async def test_track_repeats(session: AsyncSession) -> None:
+    with pytest.raises(budget.QueryBudgetExceeded, match="likely an N\\+1"):
+        with budget.track(repeats=2):
+            for age in range(3):
+                await session.exec(select(Hero).where(Hero.age == age))
+
+
+@pytest.mark.asyncio
+async def test_route_over_budget(
+    client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    # Any repeat at all, so that listing heroes goes over
+    monkeypatch.setattr(config, "query_budget_repeat_limit", 0)
+    with pytest.raises(budget.QueryBudgetExceeded, match="GET /api/heroes/"):
+        await client.get("/api/heroes/")
+
+    monkeypatch.setattr(config, "query_budget_mode", "warn")
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        r = await client.get("/api/heroes/")
+    assert r.is_success
+    assert any("GET /api/heroes/" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,150 @@
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, HeroMissionLink, Mission
+
+
+@pytest.mark.asyncio
+async def test_bulk_hero_lifecycle(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    missing_id = str(uuid.uuid4())
+
+    statements.clear()
+    r = await client.post(
+        "/api/heroes/bulk",
+        params={"chunk_size": 2},
+        json=[{"name": f"Hero {i}", "secret_name": "Secret"} for i in range(5)],
+    )
+    assert r.status_code == status.HTTP_200_OK
+    created = r.json()
+    assert [item["status"] for item in created] == [status.HTTP_201_CREATED] * 5
+    # One executemany INSERT per chunk
+    assert len(statements) == 3
+    hero_ids = [item["id"] for item in created]
+
+    r = await client.patch(
+        "/api/heroes/bulk",
+        json=[{"id": hero_ids[0], "age": 30}, {"id": missing_id, "age": 1}],
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in r.json()] == [
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    hero = await session.get(Hero, uuid.UUID(hero_ids[0]), populate_existing=True)
+    assert hero is not None
+    assert hero.age == 30
+
+    r = await client.request(
+        "DELETE", "/api/heroes/bulk", json=[hero_ids[1], missing_id]
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in r.json()] == [
+        status.HTTP_204_NO_CONTENT,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    heroes = await session.exec(select(Hero.id))
+    assert len(heroes.all()) == 4
+
+
+@pytest.mark.asyncio
+async def test_bulk_mission_assignments(
+    session: AsyncSession, client: AsyncClient
+) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    mission = Mission(description="Save the cat")
+    assignment = {"hero_id": str(hero.id), "mission_id": str(mission.id)}
+    session.add_all([hero, mission])
+    await session.commit()
+
+    r = await client.post(
+        "/api/missions/assignments/bulk",
+        json=[
+            assignment,
+            assignment,
+            {"hero_id": str(uuid.uuid4()), "mission_id": assignment["mission_id"]},
+        ],
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in r.json()] == [
+        status.HTTP_201_CREATED,
+        status.HTTP_304_NOT_MODIFIED,
+        status.HTTP_404_NOT_FOUND,
+    ]
+    links = await session.exec(select(HeroMissionLink))
+    assert len(links.all()) == 1
+
+    r = await client.request(
+        "DELETE", "/api/missions/assignments/bulk", json=[assignment, assignment]
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in r.json()] == [
+        status.HTTP_204_NO_CONTENT,
+        status.HTTP_304_NOT_MODIFIED,
+    ]
+    links = await session.exec(select(HeroMissionLink))
+    assert links.all() == []
+
+
+@pytest.mark.asyncio
+async def test_mission_roster(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    heroes = [Hero(name=f"Hero {i}", secret_name="Secret") for i in range(4)]
+    mission = Mission(description="Save the world")
+    session.add_all([*heroes, mission])
+    await session.commit()
+    hero_ids = [str(hero.id) for hero in heroes]
+    missing_id = str(uuid.uuid4())
+    path = f"/api/missions/{mission.id}/heroes"
+
+    r = await client.get(f"/api/missions/{mission.id}")
+    assert r.json()["heroes"] == []
+
+    statements.clear()
+    r = await client.post(path, json=[*hero_ids[:2], missing_id, hero_ids[0]])
+    assert r.status_code == status.HTTP_200_OK
+    change = r.json()
+    assert sorted(change["added"]) == sorted(hero_ids[:2])
+    assert change["not_found"] == [missing_id]
+    # The mission, one INSERT ... SELECT for the whole list, then the heroes
+    # it didn't add
+    assert len(statements) == 3
+    statements.clear()
+    r = await client.post(path, json=hero_ids[2:])
+    assert sorted(r.json()["added"]) == sorted(hero_ids[2:])
+    # Every hero was added, so none is looked up
+    assert len(statements) == 2
+    r = await client.request("DELETE", path, json=hero_ids[2:])
+    assert sorted(r.json()["removed"]) == sorted(hero_ids[2:])
+
+    # Already on the roster
+    r = await client.post(path, json=hero_ids[:1])
+    assert r.json() == {"added": [], "removed": [], "not_found": []}
+
+    r = await client.put(path, json=hero_ids[1:])
+    assert r.status_code == status.HTTP_200_OK
+    change = r.json()
+    assert sorted(change["added"]) == sorted(hero_ids[2:])
+    assert change["removed"] == [hero_ids[0]]
+
+    r = await client.request("DELETE", path, json=[hero_ids[1], hero_ids[0]])
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["removed"] == [hero_ids[1]]
+
+    links = await session.exec(
+        select(HeroMissionLink.hero_id).where(HeroMissionLink.mission_id == mission.id)
+    )
+    assert sorted(str(hero_id) for hero_id in links.all()) == sorted(hero_ids[2:])
+    # The roster changes invalidated the cached mission
+    r = await client.get(f"/api/missions/{mission.id}")
+    assert sorted(hero["id"] for hero in r.json()["heroes"]) == sorted(hero_ids[2:])
+
+    r = await client.put(f"/api/missions/{missing_id}/heroes", json=[])
+    assert r.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,158 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import CacheEntry, ResponseCache, SingleFlight, response_cache
+from app.models import Hero, Team
+
+
+@pytest.mark.asyncio
+async def test_read_hero_cached(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.status_code == status.HTTP_200_OK
+
+    statements.clear()
+    cached = await client.get(f"/api/heroes/{hero.id}")
+    assert cached.status_code == status.HTTP_200_OK
+    assert cached.json() == r.json()
+    assert statements == []
+
+    r = await client.patch(f"/api/heroes/{hero.id}", json={"age": 30})
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.json()["age"] == 30
+
+    r = await client.get("/cache/stats")
+    assert r.json() == {
+        "enabled": True,
+        "entries": 1,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "coalesced": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_write_invalidates_embedding_entities(
+    session: AsyncSession, client: AsyncClient
+) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add_all([team, hero])
+    await session.commit()
+
+    r = await client.get(f"/api/teams/{team.id}")
+    assert r.json()["heroes"] == []
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.json()["team"] is None
+
+    r = await client.patch(f"/api/heroes/{hero.id}/team/{team.id}")
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get(f"/api/teams/{team.id}")
+    assert [h["id"] for h in r.json()["heroes"]] == [str(hero.id)]
+
+    # Renaming the team evicts the cached hero that embeds it
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.json()["team"]["name"] == "Preventers"
+    r = await client.patch(f"/api/teams/{team.id}", json={"name": "Avengers"})
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.json()["team"]["name"] == "Avengers"
+
+
+def test_response_cache_bounds() -> None:
+    cache = ResponseCache(enabled=True, max_entries=2, ttl=60)
+    a, b, c = (("hero", Hero(name=n, secret_name=n).id) for n in "abc")
+    cache.set(a, b"a", etag='"a"')
+    cache.set(b, b"b", etag='"b"')
+    assert cache.get(a) is not None
+    cache.set(c, b"c", etag='"c"')
+    assert cache.get(b) is None
+    assert cache.evictions == 1
+
+    # A write during the load makes its result too stale to store
+    token = cache.token()
+    cache.invalidate(a)
+    cache.set(b, b"b", etag='"b"', token=token)
+    assert cache.get(b) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_share_one_load(
+    session: AsyncSession,
+    client: AsyncClient,
+    statements: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    session.add_all([team, Hero(name="Deadpond", secret_name="Dive", team=team)])
+    await session.commit()
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+    statements.clear()
+    responses = await asyncio.gather(
+        *(client.get(f"/api/teams/{team.id}") for _ in range(20))
+    )
+    assert {r.status_code for r in responses} == {status.HTTP_200_OK}
+    assert len({r.content for r in responses}) == 1
+    # The team and its heroes, loaded once
+    assert len(statements) == 2
+    r = await client.get("/cache/stats")
+    assert r.json()["coalesced"] == 19
+
+    missing = uuid.uuid4()
+    responses = await asyncio.gather(
+        *(client.get(f"/api/teams/{missing}") for _ in range(3))
+    )
+    assert {r.status_code for r in responses} == {status.HTTP_404_NOT_FOUND}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_bypassed_after_writes() -> None:
+    flights = SingleFlight(enabled=True)
+    key = ("team", uuid.uuid4())
+    release = asyncio.Event()
+    loads = 0
+
+    async def load() -> CacheEntry:
+        nonlocal loads
+        loads += 1
+        number = loads
+        await release.wait()
+        return CacheEntry(f"{number}".encode(), 0.0, etag="etag")
+
+    leader = asyncio.create_task(flights.run(key, 0, load))
+    await asyncio.sleep(0)
+    joined = asyncio.create_task(flights.run(key, 0, load))
+    # A write invalidated the cache after the load began
+    fresh = asyncio.create_task(flights.run(key, 1, load))
+    await asyncio.sleep(0)
+    release.set()
+    first = await leader
+    assert first.content == b"1"
+    assert await joined is first
+    assert (await fresh).content == b"2"
+    assert flights.coalesced == 1
+
+    # Followers of a cancelled load run their own
+    release.clear()
+    leader = asyncio.create_task(flights.run(key, 1, load))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.run(key, 1, load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert (await follower).content == b"4"
+    assert flights.coalesced == 1
@@ -0,0 +1,218 @@
+import asyncio
+import json
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import changes
+from app.changes import EVENT_STREAM_MEDIA_TYPE, change_feed
+from app.core.config import config
+from app.models import Change, Hero
+
+
+def summary(changes: list[dict[str, Any]]) -> list[tuple[str, str, str]]:
+    return [
+        (change["entity"], change["entity_id"], change["action"]) for change in changes
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writes_recorded(session: AsyncSession, client: AsyncClient) -> None:
+    r = await client.post(
+        "/api/teams/", json={"name": "Preventers", "headquarters": "Sharp Tower"}
+    )
+    team_id = r.json()["id"]
+    r = await client.post(
+        "/api/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    )
+    hero_id = r.json()["id"]
+    r = await client.post("/api/missions/", json={"description": "Save the cat"})
+    mission_id = r.json()["id"]
+    await client.patch(f"/api/heroes/{hero_id}/team/{team_id}")
+    await client.post(f"/api/missions/{mission_id}/heroes/{hero_id}")
+    await client.delete(f"/api/missions/{mission_id}/heroes/{hero_id}")
+    await client.delete(f"/api/heroes/{hero_id}")
+    # Bulk statements go through the same triggers
+    r = await client.post(
+        "/api/heroes/bulk",
+        json=[{"name": f"Hero {i}", "secret_name": "Secret"} for i in range(2)],
+    )
+    created = [result["id"] for result in r.json()]
+
+    r = await client.get("/api/changes/", params={"since": 0})
+    assert r.status_code == status.HTTP_200_OK
+    changes = r.json()
+    assert [change["seq"] for change in changes] == list(range(1, 10))
+    assert summary(changes) == [
+        ("team", team_id, "create"),
+        ("hero", hero_id, "create"),
+        ("mission", mission_id, "create"),
+        ("hero", hero_id, "update"),
+        ("mission", mission_id, "assign"),
+        ("mission", mission_id, "unassign"),
+        ("hero", hero_id, "delete"),
+        ("hero", created[0], "create"),
+        ("hero", created[1], "create"),
+    ]
+    assert changes[4]["hero_id"] == changes[5]["hero_id"] == hero_id
+
+    # Rolled back writes leave no change behind
+    session.add(Hero(name="Spider-Boy", secret_name="Pedro Parqueador"))
+    await session.flush()
+    await session.rollback()
+    results = await session.exec(select(Change).order_by(col(Change.seq).desc()))
+    assert results.first().seq == 9
+
+
+@pytest.mark.asyncio
+async def test_long_polls_share_one_tailer(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    await change_feed.poll(session)
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+
+    statements.clear()
+    polls = [
+        asyncio.create_task(client.get("/api/changes/", params={"since": 0, "wait": 5}))
+        for _ in range(10)
+    ]
+    await asyncio.sleep(0.05)
+    # Subscribers wait on the feed, not on the database
+    assert statements == []
+    assert not any(poll.done() for poll in polls)
+    await change_feed.poll(session)
+    for r in await asyncio.gather(*polls):
+        assert r.status_code == status.HTTP_200_OK
+        assert summary(r.json()) == [("hero", str(hero.id), "create")]
+    assert len(statements) == 1
+
+    # By default only later changes, and none after waiting
+    r = await client.get("/api/changes/", params={"wait": 0.01})
+    assert r.json() == []
+    r = await client.get("/api/changes/", params={"since": 1, "wait": 0.01})
+    assert r.json() == []
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_from_outbox(
+    session: AsyncSession,
+    client: AsyncClient,
+    statements: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    session.add_all(Hero(name=f"Hero {i}", secret_name="Secret") for i in range(3))
+    await session.commit()
+    # Before the tailer's first read, every subscriber reads the outbox
+    r = await client.get("/api/changes/", params={"since": 1})
+    assert [change["seq"] for change in r.json()] == [2, 3]
+
+    # The feed only keeps the latest change in memory
+    monkeypatch.setattr(change_feed, "recent", deque(maxlen=1))
+    await change_feed.poll(session)
+    statements.clear()
+    r = await client.get("/api/changes/", params={"since": 0, "limit": 2})
+    assert [change["seq"] for change in r.json()] == [1, 2]
+    assert len(statements) == 1
+    r = await client.get("/api/changes/", params={"since": 2})
+    assert [change["seq"] for change in r.json()] == [3]
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_event_stream(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    session.add_all(Hero(name=f"Hero {i}", secret_name="Secret") for i in range(2))
+    await session.commit()
+    await change_feed.poll(session)
+    monkeypatch.setattr(config, "changes_heartbeat_seconds", 0.01)
+
+    headers = {"Accept": EVENT_STREAM_MEDIA_TYPE, "Accept-Encoding": "gzip"}
+    r = await client.get(
+        "/api/changes/", params={"since": 0, "wait": 0.05}, headers=headers
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith(EVENT_STREAM_MEDIA_TYPE)
+    # Events go out as they happen, uncompressed
+    assert "content-encoding" not in r.headers
+    frames = r.text.split("\n\n")
+    assert frames[0].startswith("id: 1\nevent: change\ndata: ")
+    assert json.loads(frames[1].split("data: ")[1])["seq"] == 2
+    assert ": keep-alive" in frames[2:]
+
+    # Reconnecting with Last-Event-ID resumes after it
+    r = await client.get(
+        "/api/changes/",
+        params={"wait": 0.01},
+        headers=headers | {"Last-Event-ID": "1"},
+    )
+    assert r.text.startswith("id: 2\n")
+    assert "id: 1\n" not in r.text
+
+
+@pytest.mark.asyncio
+async def test_tailer_reads_when_woken(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(change_feed, "interval", 60)
+    await change_feed.poll(session)
+    tailer = asyncio.create_task(change_feed.run(session.bind))
+    try:
+        poll = asyncio.create_task(client.get("/api/changes/", params={"wait": 5}))
+        await asyncio.sleep(0.05)
+        hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+        session.add(hero)
+        await session.commit()
+        # As the write session does once its write is committed
+        change_feed.wake()
+        # Long before the next scheduled read
+        async with asyncio.timeout(1):
+            changes = (await poll).json()
+        assert summary(changes) == [("hero", str(hero.id), "create")]
+        assert change_feed.polls == 3
+    finally:
+        tailer.cancel()
+
+
+@pytest.mark.asyncio
+async def test_retention(session: AsyncSession, client: AsyncClient) -> None:
+    session.add_all(Hero(name=f"Hero {i}", secret_name="Secret") for i in range(5))
+    await session.commit()
+
+    assert await changes.prune(session, keep=2) == 3
+    results = await session.exec(select(Change.seq))
+    assert results.all() == [4, 5]
+    # Subscribers whose next changes were pruned start over
+    for since in (0, 2):
+        r = await client.get("/api/changes/", params={"since": since})
+        assert r.status_code == status.HTTP_410_GONE
+    r = await client.get("/api/changes/", params={"since": 3})
+    assert [change["seq"] for change in r.json()] == [4, 5]
+
+    pruned = asyncio.Event()
+
+    @asynccontextmanager
+    async def write_session() -> AsyncIterator[AsyncSession]:
+        yield session
+        pruned.set()
+
+    retention = asyncio.create_task(
+        changes.run_retention(write_session, keep=1, interval=60)
+    )
+    try:
+        async with asyncio.timeout(1):
+            await pruned.wait()
+    finally:
+        retention.cancel()
+    results = await session.exec(select(Change.seq))
+    assert results.all() == [5]
@@ -0,0 +1,146 @@
+import gzip
+from compression import zstd
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import compression
+from app.core.config import config
+from app.models import Hero
+
+
+async def get_raw(
+    client: AsyncClient, url: str, accept_encoding: str
+) -> tuple[Response, bytes]:
+    """The response to a GET, and its body as sent, without decoding it."""
+    async with client.stream(
+        "GET", url, headers={"Accept-Encoding": accept_encoding}
+    ) as r:
+        return r, b"".join([chunk async for chunk in r.aiter_raw()])
+
+
+def test_negotiate() -> None:
+    assert compression.negotiate("gzip, deflate") == "gzip"
+    assert compression.negotiate("gzip, zstd") == "zstd"
+    assert compression.negotiate("zstd;q=0.5, gzip") == "gzip"
+    assert compression.negotiate("*") == "zstd"
+    assert compression.negotiate("*, zstd;q=0") == next(
+        encoding for encoding in compression.ENCODERS if encoding != "zstd"
+    )
+    assert compression.negotiate("gzip;q=0") is None
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("") is None
+
+
+@pytest.mark.asyncio
+async def test_compressed_responses(session: AsyncSession, client: AsyncClient) -> None:
+    session.add_all(
+        Hero(name=f"Hero {i}", secret_name="Secret", age=30) for i in range(50)
+    )
+    await session.commit()
+
+    r, plain = await get_raw(client, "/api/heroes/", "identity")
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept-Encoding"
+
+    r, body = await get_raw(client, "/api/heroes/", "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) == len(body) < len(plain) / 5
+    assert gzip.decompress(body) == plain
+
+    r, body = await get_raw(client, "/api/heroes/", "gzip, zstd")
+    assert r.headers["content-encoding"] == "zstd"
+    assert zstd.decompress(body) == plain
+
+    # Too small to be worth it
+    r, body = await get_raw(client, "/health", "gzip")
+    assert r.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in r.headers
+    assert body == b'{"status":"ok"}'
+
+
+@pytest.mark.asyncio
+async def test_compressed_stream(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    session.add_all(Hero(name=f"Hero {i}", secret_name="Secret") for i in range(50))
+    await session.commit()
+    monkeypatch.setattr(config, "export_batch_size", 10)
+
+    r, plain = await get_raw(client, "/api/heroes/export", "identity")
+    r, body = await get_raw(client, "/api/heroes/export", "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert gzip.decompress(body) == plain
+    assert len(plain.splitlines()) == 50
+
+
+@pytest.mark.asyncio
+async def test_cached_responses_compressed_once(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+    monkeypatch.setattr(config, "compression_min_size", 0)
+    compressed: list[str] = []
+    compress = compression.compress
+
+    def counting_compress(content: bytes, encoding: str) -> bytes:
+        compressed.append(encoding)
+        return compress(content, encoding)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+
+    url = f"/api/heroes/{hero.id}"
+    r, plain = await get_raw(client, url, "identity")
+    bodies = []
+    for _ in range(3):
+        r, body = await get_raw(client, url, "gzip")
+        assert r.status_code == status.HTTP_200_OK
+        assert r.headers["content-encoding"] == "gzip"
+        bodies.append(body)
+    assert gzip.decompress(bodies[0]) == plain
+    assert bodies.count(bodies[0]) == 3
+    r, body = await get_raw(client, url, "zstd")
+    assert zstd.decompress(body) == plain
+    assert compressed == ["gzip", "zstd"]
+
+    # Revalidation still answers 304, whatever the encoding
+    r = await client.get(
+        url, headers={"If-None-Match": r.headers["ETag"], "Accept-Encoding": "gzip"}
+    )
+    assert r.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_etag_per_encoding(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+    monkeypatch.setattr(config, "compression_min_size", 0)
+
+    url = f"/api/heroes/{hero.id}"
+    r, _ = await get_raw(client, url, "identity")
+    etag = r.headers["ETag"]
+    r, _ = await get_raw(client, url, "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    gzip_etag = r.headers["ETag"]
+    assert gzip_etag != etag
+
+    # Either validates the hero, and a 304 keeps the one the client holds
+    for held in (etag, gzip_etag):
+        r = await client.get(
+            url, headers={"If-None-Match": held, "Accept-Encoding": "gzip"}
+        )
+        assert r.status_code == status.HTTP_304_NOT_MODIFIED
+        assert r.headers["ETag"] == held
+    r = await client.patch(url, json={"age": 48}, headers={"If-Match": gzip_etag})
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get(url, headers={"If-None-Match": gzip_etag})
+    assert r.status_code == status.HTTP_200_OK
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import response_cache
+from app.models import Hero, Team
+
+
+@pytest.mark.asyncio
+async def test_read_team_if_none_match(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson", team_id=team.id)
+    session.add_all([team, hero])
+    await session.commit()
+
+    r = await client.get(f"/api/teams/{team.id}")
+    assert r.status_code == status.HTTP_200_OK
+    etag = r.headers["ETag"]
+
+    response_cache.clear()
+    statements.clear()
+    r = await client.get(f"/api/teams/{team.id}", headers={"If-None-Match": etag})
+    assert r.status_code == status.HTTP_304_NOT_MODIFIED
+    assert r.headers["ETag"] == etag
+    # Answered from version columns, without loading the heroes
+    assert len(statements) == 1
+
+    # Changing an embedded hero changes the team's ETag
+    r = await client.patch(f"/api/heroes/{hero.id}", json={"age": 30})
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get(f"/api/teams/{team.id}", headers={"If-None-Match": etag})
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["ETag"] != etag
+    assert r.json()["heroes"][0]["age"] == 30
+
+
+@pytest.mark.asyncio
+async def test_update_hero_if_match(session: AsyncSession, client: AsyncClient) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+
+    r = await client.get(f"/api/heroes/{hero.id}")
+    etag = r.headers["ETag"]
+
+    r = await client.patch(
+        f"/api/heroes/{hero.id}", json={"age": 30}, headers={"If-Match": etag}
+    )
+    assert r.status_code == status.HTTP_200_OK
+
+    # The first update changed the ETag, so a second writer holding it loses
+    r = await client.patch(
+        f"/api/heroes/{hero.id}", json={"age": 31}, headers={"If-Match": etag}
+    )
+    assert r.status_code == status.HTTP_412_PRECONDITION_FAILED
+    r = await client.get(f"/api/heroes/{hero.id}")
+    assert r.json()["age"] == 30
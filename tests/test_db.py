@@ -0,0 +1,281 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.changes import change_feed
+from app.core import cache, db
+from app.core.cache import response_cache
+from app.core.config import Settings
+from app.core.db import build_engine
+from app.core.writer import SerialWriter
+from app.deps import get_write_session
+from app.main import prepare_statements
+from app.models import Hero
+
+
+@pytest.mark.asyncio
+async def test_sqlite_engine_profile(tmp_path: Path) -> None:
+    settings = Settings.model_validate(
+        {
+            "database_url": f"sqlite+aiosqlite:///{tmp_path}/profile.db",
+            "db_pool_size": 3,
+            "sqlite_busy_timeout": 1234,
+            "sqlite_cache_size": -2048,
+        }
+    )
+    engine = build_engine(settings)
+    assert engine.echo is False
+    assert engine.pool.size() == 3
+
+    async with engine.connect() as conn:
+        pragmas = {
+            name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+        }
+    await engine.dispose()
+
+    # synchronous=NORMAL reads back as 1
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 1234,
+        "cache_size": -2048,
+    }
+
+
+@pytest.mark.asyncio
+async def test_serial_writer_group_commit(tmp_path: Path) -> None:
+    settings = Settings.model_validate(
+        {"database_url": f"sqlite+aiosqlite:///{tmp_path}/writer.db"}
+    )
+    write_engine = build_engine(settings, single_writer=True)
+    read_engine = build_engine(settings, read_only=True)
+    async with write_engine.begin() as conn:
+        await conn.run_sync(db.migrate)
+    writer = SerialWriter(write_engine)
+
+    async def write(i: int) -> None:
+        async with (
+            writer.transaction() as connection,
+            AsyncSession(
+                connection, join_transaction_mode="create_savepoint"
+            ) as session,
+        ):
+            session.add(Hero(name=f"Hero {i}", secret_name="Secret"))
+            if i == 0:
+                raise RuntimeError("rolled back")
+            await session.commit()
+
+    results = await asyncio.gather(
+        *(write(i) for i in range(20)), return_exceptions=True
+    )
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [None] * 19
+    # Writes queued behind each other share commits
+    assert 0 < writer.commits < 19
+
+    async with AsyncSession(read_engine) as session:
+        heroes = await session.exec(select(Hero.name))
+        assert sorted(heroes.all()) == sorted(f"Hero {i}" for i in range(1, 20))
+        session.add(Hero(name="Deadpond", secret_name="Dive Wilson"))
+        with pytest.raises(OperationalError):
+            await session.commit()
+
+    await writer.close()
+    await read_engine.dispose()
+    await write_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_serial_writer_failed_write_releases_lock(tmp_path: Path) -> None:
+    settings = Settings.model_validate(
+        {
+            "database_url": f"sqlite+aiosqlite:///{tmp_path}/writer.db",
+            "sqlite_busy_timeout": 100,
+        }
+    )
+    # Two engines stand in for two worker processes
+    engines = [build_engine(settings, single_writer=True) for _ in range(2)]
+    async with engines[0].begin() as conn:
+        await conn.run_sync(db.migrate)
+    writers = [SerialWriter(engine) for engine in engines]
+
+    async def write(writer: SerialWriter, name: str, *, fail: bool = False) -> None:
+        async with (
+            writer.transaction() as connection,
+            AsyncSession(
+                connection, join_transaction_mode="create_savepoint"
+            ) as session,
+        ):
+            session.add(Hero(name=name, secret_name="Secret"))
+            await session.flush()
+            if fail:
+                raise RuntimeError("rolled back")
+            await session.commit()
+
+    with pytest.raises(RuntimeError):
+        await write(writers[0], "Deadpond", fail=True)
+    assert writers[0]._connection is not None
+    assert not writers[0]._connection.in_transaction()
+    await write(writers[1], "Rusty-Man")
+    await write(writers[0], "Spider-Boy")
+
+    read_engine = build_engine(settings, read_only=True)
+    async with AsyncSession(read_engine) as session:
+        heroes = await session.exec(select(Hero.name))
+        assert sorted(heroes.all()) == ["Rusty-Man", "Spider-Boy"]
+    for writer in writers:
+        await writer.close()
+    for engine in [*engines, read_engine]:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_serial_writer_fails_write_after_commit(tmp_path: Path) -> None:
+    settings = Settings.model_validate(
+        {"database_url": f"sqlite+aiosqlite:///{tmp_path}/writer.db"}
+    )
+    engine = build_engine(settings, single_writer=True)
+    read_engine = build_engine(settings, read_only=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(db.migrate)
+    writer = SerialWriter(engine)
+
+    async def write(name: str, *, fail: bool = False) -> None:
+        async with (
+            writer.transaction() as connection,
+            AsyncSession(
+                connection, join_transaction_mode="create_savepoint"
+            ) as session,
+        ):
+            session.add(Hero(name=name, secret_name="Secret"))
+            await session.commit()
+            await asyncio.sleep(0.01)
+            if fail:
+                raise RuntimeError("failed after its commit")
+
+    # Alone in its group, and with a write queued behind it
+    with pytest.raises(RuntimeError):
+        await write("Deadpond", fail=True)
+    results = await asyncio.gather(
+        write("Rusty-Man", fail=True), write("Spider-Boy"), return_exceptions=True
+    )
+    assert isinstance(results[0], RuntimeError)
+    assert results[1] is None
+
+    async with AsyncSession(read_engine) as session:
+        heroes = await session.exec(select(Hero.name))
+        assert heroes.all() == ["Spider-Boy"]
+    await writer.close()
+    await read_engine.dispose()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_write_session_after_group_commit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings = Settings.model_validate(
+        {"database_url": f"sqlite+aiosqlite:///{tmp_path}/writer.db"}
+    )
+    write_engine = build_engine(settings, single_writer=True)
+    read_engine = build_engine(settings, read_only=True)
+    async with write_engine.begin() as conn:
+        await conn.run_sync(db.migrate)
+    writer = SerialWriter(write_engine)
+    monkeypatch.setattr(db, "read_engine", read_engine, raising=False)
+    monkeypatch.setattr(db, "write_engine", write_engine, raising=False)
+    monkeypatch.setattr(db, "writer", writer)
+    monkeypatch.setattr(response_cache, "enabled", True)
+    woken: list[int] = []
+    monkeypatch.setattr(change_feed, "wake", lambda: woken.append(writer.commits))
+
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    key = ("hero", hero.id)
+    async with asynccontextmanager(get_write_session)() as session:
+        session.add(hero)
+        await session.commit()
+        cache.invalidate(session, key)
+        # A read caches the hero before the writer commits the group
+        response_cache.set(key, b"{}", etag='"stale"')
+        assert writer.commits == 0
+    assert writer.commits == 1
+    assert response_cache.get(key) is None
+    # Subscribers were woken once the write was durable
+    assert woken == [1]
+
+    response_cache.clear()
+    await writer.close()
+    await read_engine.dispose()
+    await write_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_serial_writer_queued_writer_cancelled(tmp_path: Path) -> None:
+    settings = Settings.model_validate(
+        {"database_url": f"sqlite+aiosqlite:///{tmp_path}/writer.db"}
+    )
+    engine = build_engine(settings, single_writer=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(db.migrate)
+    writer = SerialWriter(engine)
+    release = asyncio.Event()
+
+    async def first() -> None:
+        async with writer.transaction() as connection:
+            await connection.exec_driver_sql(
+                "INSERT INTO team (id, name, headquarters, version)"
+                " VALUES ('a', 'Preventers', 'Sharp Tower', 1)"
+            )
+            await release.wait()
+
+    async def queued() -> None:
+        async with writer.transaction():
+            pass
+
+    leader = asyncio.create_task(first())
+    await asyncio.sleep(0.05)
+    follower = asyncio.create_task(queued())
+    await asyncio.sleep(0)
+    # The leader leaves its commit to the follower, which never gets the lock
+    release.set()
+    follower.cancel()
+    async with asyncio.timeout(1):
+        await leader
+    assert follower.cancelled()
+    assert writer.commits == 1
+    assert writer._connection is not None
+    assert not writer._connection.in_transaction()
+
+    await writer.close()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_connect_warms_pools(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings = Settings.model_validate(
+        {"database_url": f"sqlite+aiosqlite:///{tmp_path}/warm.db", "db_pool_size": 3}
+    )
+    # `connect` replaces the process's engines, which later tests may use
+    for name in ("read_engine", "write_engine", "writer"):
+        monkeypatch.setattr(db, name, getattr(db, name, None), raising=False)
+    db.connect(settings)
+    try:
+        async with db.write_engine.begin() as conn:
+            await conn.run_sync(db.migrate)
+        await db.warm(prepare_statements)
+        assert db.read_engine.pool.checkedin() == 3
+        assert db.write_engine.pool.checkedin() == 1
+        async with db.read_engine.connect() as conn:
+            journal_mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+        assert journal_mode == "wal"
+    finally:
+        await db.disconnect()
+    assert db.read_engine.pool.checkedin() == 0
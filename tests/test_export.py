@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import config
+from app.export import NDJSON_MEDIA_TYPE
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+
+@pytest.mark.asyncio
+async def test_export_heroes(
+    session: AsyncSession, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Spread the rows over several cursor batches
+    monkeypatch.setattr(config, "export_batch_size", 2)
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    heroes = [
+        Hero(name=f"Hero {i}", secret_name="Secret", team_id=team.id if i % 2 else None)
+        for i in range(5)
+    ]
+    session.add_all([team, *heroes])
+    await session.commit()
+
+    r = await client.get("/api/heroes/export")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"] == NDJSON_MEDIA_TYPE
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(row["id"] for row in rows) == sorted(str(h.id) for h in heroes)
+    assert set(rows[0]) == {"id", "name", "secret_name", "age", "team_id"}
+
+    r = await client.get("/api/heroes/export", params={"team_id": str(team.id)})
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 2
+    assert {row["team_id"] for row in rows} == {str(team.id)}
+
+
+@pytest.mark.asyncio
+async def test_export_assignments(session: AsyncSession, client: AsyncClient) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    missions = [
+        Mission(description="Save the cat"),
+        Mission(description="Find the hat"),
+    ]
+    session.add_all([hero, *missions])
+    session.add_all(
+        [HeroMissionLink(hero_id=hero.id, mission_id=m.id) for m in missions]
+    )
+    await session.commit()
+
+    r = await client.get(
+        "/api/missions/assignments/export", params={"mission_id": str(missions[0].id)}
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert [json.loads(line) for line in r.text.splitlines()] == [
+        {"hero_id": str(hero.id), "mission_id": str(missions[0].id)}
+    ]
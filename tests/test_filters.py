@@ -0,0 +1,127 @@
+import itertools
+import uuid
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+FILTERS: dict[str, str] = {
+    "name": "Dead",
+    "age_min": "20",
+    "age_max": "60",
+    "team_id": str(uuid.uuid4()),
+    "mission_id": str(uuid.uuid4()),
+}
+
+
+@pytest.fixture(name="executed")
+def executed_fixture(session: AsyncSession) -> Generator[list[tuple[str, Any]]]:
+    """Collects every statement sent to the test database, with its parameters."""
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(
+        _conn: object,
+        _cursor: object,
+        statement: str,
+        parameters: Any,
+        *_args: object,
+    ) -> None:
+        executed.append((statement, parameters))
+
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.asyncio
+async def test_read_heroes_filters(session: AsyncSession, client: AsyncClient) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    mission = Mission(description="Save the cat")
+    heroes = [
+        Hero(name="Deadpond", secret_name="Dive Wilson", age=30, team_id=team.id),
+        Hero(name="Deadlift", secret_name="Lift Wilson"),
+        Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48, team_id=team.id),
+        Hero(name="Spider-Boy", secret_name="Pedro Parqueador", age=16),
+    ]
+    session.add_all([team, mission, *heroes])
+    session.add(HeroMissionLink(hero_id=heroes[2].id, mission_id=mission.id))
+    await session.commit()
+
+    async def names(**params: str) -> list[str]:
+        r = await client.get("/api/heroes/", params=params)
+        assert r.status_code == status.HTTP_200_OK
+        return [hero["name"] for hero in r.json()]
+
+    assert await names(name="Dead") == ["Deadlift", "Deadpond"]
+    assert await names(age_min="20", age_max="50") == ["Deadpond", "Rusty-Man"]
+    assert await names(team_id=str(team.id)) == ["Deadpond", "Rusty-Man"]
+    assert await names(mission_id=str(mission.id)) == ["Rusty-Man"]
+    assert await names(sort="age") == [
+        "Deadlift",
+        "Spider-Boy",
+        "Deadpond",
+        "Rusty-Man",
+    ]
+    assert await names(sort="-age") == [
+        "Rusty-Man",
+        "Deadpond",
+        "Spider-Boy",
+        "Deadlift",
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort", ["name", "age", "-age"])
+async def test_read_heroes_age_cursor(
+    session: AsyncSession, client: AsyncClient, sort: str
+) -> None:
+    session.add_all(
+        Hero(name=f"Hero {i}", secret_name="Secret", age=None if i % 3 else i % 4)
+        for i in range(12)
+    )
+    await session.commit()
+    r = await client.get("/api/heroes/", params={"sort": sort})
+    expected = [hero["id"] for hero in r.json()]
+
+    seen: list[str] = []
+    params = {"sort": sort, "limit": "5"}
+    while True:
+        r = await client.get("/api/heroes/", params=params)
+        seen.extend(hero["id"] for hero in r.json())
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["after"] = r.headers["X-Next-Cursor"]
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_read_heroes_filters_use_indexes(
+    session: AsyncSession, client: AsyncClient, executed: list[tuple[str, Any]]
+) -> None:
+    connection = await session.connection()
+    for sort, size in itertools.product(
+        ["name", "age", "-age"], range(len(FILTERS) + 1)
+    ):
+        for combination in itertools.combinations(FILTERS, size):
+            executed.clear()
+            params = {"sort": sort} | {key: FILTERS[key] for key in combination}
+            r = await client.get("/api/heroes/", params=params)
+            assert r.status_code == status.HTTP_200_OK
+            [(statement, parameters)] = executed
+            plan = await connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            scans = [row.detail for row in plan if row.detail.startswith("SCAN")]
+            if combination:
+                # Every filter is a SEARCH on some index
+                assert scans == [], params
+            else:
+                # Unfiltered pages walk the sort index, stopping at the limit
+                assert all("USING INDEX" in scan for scan in scans), params
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import db
+from app.core.health import ReadinessProbe, pool_usage, readiness
+
+
+@pytest.mark.asyncio
+async def test_liveness(client: AsyncClient, statements: list[str]) -> None:
+    for path in ("/health", "/health/live"):
+        r = await client.get(path)
+        assert r.status_code == status.HTTP_200_OK
+        assert r.json() == {"status": "ok"}
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_readiness(
+    session: AsyncSession,
+    client: AsyncClient,
+    statements: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(db, "read_engine", session.bind, raising=False)
+    monkeypatch.setattr(readiness, "last", None)
+    r = await client.get("/health/ready")
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert r.json()["status"] == "unavailable"
+
+    await readiness.check(session.bind)
+    assert statements == ["SELECT 1"]
+    for _ in range(3):
+        r = await client.get("/health/ready")
+        assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    assert body["status"] == "ok"
+    assert body["db_latency_ms"] >= 0
+    # Probes only read the background check's result
+    assert statements == ["SELECT 1"]
+
+
+@pytest.mark.asyncio
+async def test_readiness_pool_exhausted(tmp_path: Path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/health.db", pool_size=1, max_overflow=0
+    )
+    probe = ReadinessProbe(interval=5, timeout=0.1)
+    async with engine.connect():
+        assert pool_usage(engine, max_overflow=0) == (1, 1)
+        check = await probe.check(engine)
+    await engine.dispose()
+    assert not check.ok
+    assert check.error == "timed out"
+    assert not probe.is_ready()
@@ -9,7 +9,7 @@ from app.models import Hero
 @pytest.mark.asyncio
 async def test_create_hero(client: AsyncClient) -> None:
     r = await client.post(
-        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+        "/api/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
     )
     assert r.status_code == status.HTTP_201_CREATED
     data = r.json()
@@ -22,14 +22,14 @@ async def test_create_hero(client: AsyncClient) -> None:
 @pytest.mark.asyncio
 async def test_create_hero_incomplete(client: AsyncClient) -> None:
     # Falis validation because of missing secret_name in json
-    r = await client.post("/heroes/", json={"name": "Deadpond"})
+    r = await client.post("/api/heroes/", json={"name": "Deadpond"})
     assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
 
 @pytest.mark.asyncio
 async def test_create_hero_invalid(client: AsyncClient) -> None:
     r = await client.post(
-        "/heroes/",
+        "/api/heroes/",
         json={
             "name": "Deadpond",
             "secret_name": {"message": "Do you wanna know my secret identity?"},
@@ -48,7 +48,7 @@ async def test_read_heroes(session: AsyncSession, client: AsyncClient) -> None:
     await session.refresh(hero_1)
     await session.refresh(hero_2)
 
-    r = await client.get("/heroes/")
+    r = await client.get("/api/heroes/")
     assert r.status_code == status.HTTP_200_OK
     data = r.json()
     assert len(data) == 2
@@ -74,7 +74,7 @@ async def test_read_hero(session: AsyncSession, client: AsyncClient) -> None:
     await session.commit()
     await session.refresh(hero_1)
 
-    r = await client.get(f"/heroes/{hero_1.id!s}")
+    r = await client.get(f"/api/heroes/{hero_1.id!s}")
     assert r.status_code == status.HTTP_200_OK
     data = r.json()
     assert data["name"] == hero_1.name
@@ -90,7 +90,7 @@ async def test_update_hero(session: AsyncSession, client: AsyncClient) -> None:
     await session.commit()
     await session.refresh(hero_1)
 
-    r = await client.patch(f"/heroes/{hero_1.id}", json={"name": "Deadpuddle"})
+    r = await client.patch(f"/api/heroes/{hero_1.id}", json={"name": "Deadpuddle"})
     assert r.status_code == status.HTTP_200_OK
     data = r.json()
     assert data["name"] == "Deadpuddle"
@@ -105,8 +105,37 @@ async def test_delete_hero(session: AsyncSession, client: AsyncClient) -> None:
     await session.commit()
     await session.refresh(hero_1)
 
-    r = await client.delete(f"/heroes/{hero_1.id}")
+    r = await client.delete(f"/api/heroes/{hero_1.id}")
     assert r.status_code == status.HTTP_204_NO_CONTENT
 
     hero_in_db = await session.get(Hero, hero_1.id)
     assert hero_in_db is None
+
+
+@pytest.mark.asyncio
+async def test_read_heroes_cursor(session: AsyncSession, client: AsyncClient) -> None:
+    names = ["Spider-Boy", "Deadpond", "Rusty-Max", "Captain North", "Black Lion"]
+    session.add_all(Hero(name=name, secret_name="Secret") for name in names)
+    await session.commit()
+
+    pages: list[list[str]] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        r = await client.get("/api/heroes/", params=params)
+        assert r.status_code == status.HTTP_200_OK
+        pages.append([hero["name"] for hero in r.json()])
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["after"] = r.headers["X-Next-Cursor"]
+
+    assert pages == [
+        ["Black Lion", "Captain North"],
+        ["Deadpond", "Rusty-Max"],
+        ["Spider-Boy"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_heroes_invalid_cursor(client: AsyncClient) -> None:
+    r = await client.get("/api/heroes/", params={"after": "not-a-cursor"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import loading
+from app.loaders import by_id
+from app.models import Hero, HeroMissionLink, Mission, Team
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest.mark.asyncio
+async def test_multi_get(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    heroes = [Hero(name=f"Hero {i}", secret_name="Secret", team=team) for i in range(3)]
+    mission = Mission(description="Save the cat")
+    session.add_all([team, *heroes, mission])
+    session.add(HeroMissionLink(hero_id=heroes[1].id, mission_id=mission.id))
+    await session.commit()
+    missing = uuid.uuid4()
+
+    statements.clear()
+    ids = [heroes[2].id, missing, heroes[1].id, heroes[2].id]
+    r = await client.get("/api/heroes/", params={"ids": [str(id) for id in ids]})
+    assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    # In request order, repeats included, with an entry for the missing id
+    assert [(entry["id"], entry["status"]) for entry in body] == [
+        (str(heroes[2].id), status.HTTP_200_OK),
+        (str(missing), status.HTTP_404_NOT_FOUND),
+        (str(heroes[1].id), status.HTTP_200_OK),
+        (str(heroes[2].id), status.HTTP_200_OK),
+    ]
+    assert body[1] == {
+        "id": str(missing),
+        "status": status.HTTP_404_NOT_FOUND,
+        "hero": None,
+        "detail": "Hero not found",
+    }
+    assert body[2]["hero"]["team"]["id"] == str(team.id)
+    assert [m["id"] for m in body[2]["hero"]["missions"]] == [str(mission.id)]
+    # One IN (...) for the heroes and their teams, one for their missions
+    assert len(statements) == 2
+    assert statements[0].count("?") == 3
+
+    r = await client.get("/api/teams/", params={"ids": [str(team.id), str(missing)]})
+    assert r.status_code == status.HTTP_200_OK
+    assert [entry["status"] for entry in r.json()] == [200, 404]
+    assert len(r.json()[0]["team"]["heroes"]) == 3
+
+    r = await client.get("/api/missions/", params={"ids": [str(mission.id)]})
+    assert r.status_code == status.HTTP_200_OK
+    assert [h["id"] for h in r.json()[0]["mission"]["heroes"]] == [str(heroes[1].id)]
+
+    r = await client.get(
+        "/api/heroes/", params={"ids": [str(uuid.uuid4()) for _ in range(101)]}
+    )
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    # A multi-get takes no filter, sort or page
+    for path, params in [
+        ("/api/heroes/", {"name": "Hero"}),
+        ("/api/heroes/", {"sort": "age", "limit": 1}),
+        ("/api/teams/", {"after": "x"}),
+        ("/api/missions/", {"offset": 1}),
+    ]:
+        r = await client.get(path, params={"ids": [str(missing)], **params})
+        assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, params
+        assert r.json()["detail"].startswith("ids can't be combined with")
+
+
+@pytest.mark.asyncio
+async def test_read_missions_pages(session: AsyncSession, client: AsyncClient) -> None:
+    missions = [Mission(description=f"Mission {i}") for i in range(3)]
+    session.add_all(missions)
+    await session.commit()
+    ids = sorted(str(mission.id) for mission in missions)
+
+    r = await client.get("/api/missions/", params={"limit": 2})
+    assert r.status_code == status.HTTP_200_OK
+    assert [m["id"] for m in r.json()] == ids[:2]
+    cursor = r.headers[NEXT_CURSOR_HEADER]
+    r = await client.get("/api/missions/", params={"limit": 2, "after": cursor})
+    assert [m["id"] for m in r.json()] == ids[2:]
+    assert NEXT_CURSOR_HEADER not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_loader_batches_concurrent_loads(
+    session: AsyncSession, statements: list[str]
+) -> None:
+    heroes = [Hero(name=f"Hero {i}", secret_name="Secret") for i in range(3)]
+    session.add_all(heroes)
+    await session.commit()
+    loader = by_id(session, Hero, loading.HERO_WITH_TEAM_MISSIONS)
+
+    statements.clear()
+    found = await asyncio.gather(
+        loader.load(heroes[0].id),
+        loader.load_many([heroes[1].id, heroes[0].id]),
+        loader.load(uuid.uuid4()),
+    )
+    assert found == [heroes[0], [heroes[1], heroes[0]], None]
+    assert loader.batches == 1
+    assert len(statements) == 2
+
+    # Later loads start a new batch
+    assert await loader.load(heroes[2].id) == heroes[2]
+    assert loader.batches == 2
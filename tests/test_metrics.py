@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import config
+from app.models import Hero
+
+
+@pytest.mark.asyncio
+async def test_metrics_by_route(session: AsyncSession, client: AsyncClient) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+
+    for _ in range(2):
+        r = await client.get(f"/api/heroes/{hero.id}")
+        assert r.status_code == status.HTTP_200_OK
+    r = await client.get("/api/nowhere")
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+
+    r = await client.get("/metrics")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = r.text.splitlines()
+    labels = 'method="GET",route="/api/heroes/{hero_id}",status="200"'
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    # Loading the hero and its missions, the second read is served from cache
+    assert f"db_statements_total{{{labels}}} 2" in lines
+    assert f"db_rows_total{{{labels}}} 1" in lines
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="",status="404"} 1'
+        in lines
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(
+    client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(config, "slow_query_ms", 0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        r = await client.get("/api/heroes/")
+    assert r.status_code == status.HTTP_200_OK
+    assert any("FROM hero" in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_rows(client: AsyncClient) -> None:
+    r = await client.post(
+        "/api/heroes/bulk",
+        json=[{"name": f"Hero {i}", "secret_name": "Secret"} for i in range(3)],
+    )
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get("/api/heroes/export")
+    assert len(r.text.splitlines()) == 3
+
+    lines = (await client.get("/metrics")).text.splitlines()
+    # Rows inserted without RETURNING, and streamed to the client
+    for route, method, rows in [
+        ("/api/heroes/bulk", "POST", 3),
+        ("/api/heroes/export", "GET", 3),
+    ]:
+        labels = f'method="{method}",route="{route}",status="200"'
+        assert f"db_rows_total{{{labels}}} {rows}" in lines, route
@@ -0,0 +1,130 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+
+@pytest_asyncio.fixture(name="team")
+async def team_fixture(session: AsyncSession) -> Team:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    mission = Mission(description="Save the cat")
+    heroes = [
+        Hero(name="Deadpond", secret_name="Dive Wilson", team_id=team.id),
+        Hero(name="Rusty-Max", secret_name="Tommy Sharp", age=48, team_id=team.id),
+    ]
+    session.add_all([team, mission, *heroes])
+    session.add_all(
+        [HeroMissionLink(hero_id=hero.id, mission_id=mission.id) for hero in heroes]
+    )
+    await session.commit()
+    await session.refresh(team)
+    return team
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/api/heroes/", 1),
+        ("/api/teams/", 1),
+    ],
+)
+async def test_list_statement_count(
+    client: AsyncClient,
+    statements: list[str],
+    team: Team,
+    path: str,
+    expected: int,
+) -> None:
+    statements.clear()
+    r = await client.get(path)
+    assert r.status_code == status.HTTP_200_OK
+    assert len(statements) == expected
+
+
+@pytest.mark.asyncio
+async def test_read_hero_statement_count(
+    session: AsyncSession, client: AsyncClient, statements: list[str], team: Team
+) -> None:
+    hero_id = (await session.exec(select(Hero.id))).first()
+
+    statements.clear()
+    r = await client.get(f"/api/heroes/{hero_id}")
+    assert r.status_code == status.HTTP_200_OK
+    data = r.json()
+    assert data["team"]["id"] == str(team.id)
+    assert len(data["missions"]) == 1
+    # The team is joined onto the hero row; missions are one selectin query.
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_team_statement_count(
+    client: AsyncClient, statements: list[str], team: Team
+) -> None:
+    statements.clear()
+    r = await client.get(f"/api/teams/{team.id}")
+    assert r.status_code == status.HTTP_200_OK
+    assert len(r.json()["heroes"]) == 2
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_mission_statement_count(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    mission = Mission(description="Find the hat")
+    session.add(mission)
+    await session.commit()
+    await session.refresh(mission)
+
+    statements.clear()
+    r = await client.get(f"/api/missions/{mission.id}")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["heroes"] == []
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_statement_counts(
+    session: AsyncSession, client: AsyncClient, statements: list[str], team: Team
+) -> None:
+    hero_id = (await session.exec(select(Hero.id))).first()
+    mission_id = (await session.exec(select(Mission.id))).first()
+
+    # Each write is a single INSERT or UPDATE ... RETURNING, with no refresh
+    for method, path, body in [
+        ("POST", "/api/heroes/", {"name": "Deadpond", "secret_name": "Dive Wilson"}),
+        ("PATCH", f"/api/heroes/{hero_id}", {"age": 30}),
+        ("PATCH", f"/api/heroes/{hero_id}/team/{team.id}", None),
+        ("POST", "/api/teams/", {"name": "Z-Force", "headquarters": "Sister Tower"}),
+        ("PATCH", f"/api/teams/{team.id}", {"headquarters": "Sharp Tower II"}),
+        ("POST", "/api/missions/", {"description": "Find the hat"}),
+        ("PATCH", f"/api/missions/{mission_id}", {"active": False}),
+    ]:
+        statements.clear()
+        r = await client.request(method, path, json=body)
+        assert r.is_success, (method, path)
+        assert len(statements) == 1, (method, path)
+
+
+@pytest.mark.asyncio
+async def test_assign_hero_to_missing_team(
+    session: AsyncSession, client: AsyncClient, team: Team
+) -> None:
+    hero_id = (await session.exec(select(Hero.id))).first()
+    missing_id = uuid.uuid4()
+
+    r = await client.patch(f"/api/heroes/{hero_id}/team/{missing_id}")
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+    assert r.json()["detail"] == "Team not found"
+
+    r = await client.patch(f"/api/heroes/{missing_id}/team/{team.id}")
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+    assert r.json()["detail"] == "Hero not found"
@@ -0,0 +1,149 @@
+import uuid
+from typing import Any
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+
+async def pages(client: AsyncClient, path: str, limit: int) -> list[list[str]]:
+    """Follows the next-page cursors of `path`, collecting each page's ids."""
+    ids: list[list[str]] = []
+    params = {"limit": str(limit)}
+    while True:
+        r = await client.get(path, params=params)
+        assert r.status_code == status.HTTP_200_OK
+        ids.append([item["id"] for item in r.json()])
+        if "X-Next-Cursor" not in r.headers:
+            return ids
+        params["after"] = r.headers["X-Next-Cursor"]
+
+
+@pytest.mark.asyncio
+async def test_collection_pages(session: AsyncSession, client: AsyncClient) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    heroes = [
+        Hero(name=name, secret_name="Secret", team=team)
+        for name in ["Rusty-Man", "Deadpond", "Spider-Boy", "Black Lion", "Wasp"]
+    ]
+    missions = [Mission(description=f"Mission {i}") for i in range(3)]
+    session.add_all([team, *heroes, *missions])
+    session.add_all(
+        [HeroMissionLink(hero_id=hero.id, mission_id=missions[0].id) for hero in heroes]
+        + [
+            HeroMissionLink(hero_id=heroes[0].id, mission_id=mission.id)
+            for mission in missions[1:]
+        ]
+    )
+    await session.commit()
+
+    by_name = [str(hero.id) for hero in sorted(heroes, key=lambda hero: hero.name)]
+    assert await pages(client, f"/api/teams/{team.id}/heroes", 2) == [
+        by_name[:2],
+        by_name[2:4],
+        by_name[4:],
+    ]
+    by_id = sorted(str(hero.id) for hero in heroes)
+    assert await pages(client, f"/api/missions/{missions[0].id}/heroes", 3) == [
+        by_id[:3],
+        by_id[3:],
+    ]
+    mission_ids = sorted(str(mission.id) for mission in missions)
+    assert await pages(client, f"/api/heroes/{heroes[0].id}/missions", 2) == [
+        mission_ids[:2],
+        mission_ids[2:],
+    ]
+
+    assert await pages(client, f"/api/missions/{missions[1].id}/heroes", 2) == [
+        [str(heroes[0].id)]
+    ]
+    for path in ["teams", "missions"]:
+        r = await client.get(f"/api/{path}/{uuid.uuid4()}/heroes")
+        assert r.status_code == status.HTTP_404_NOT_FOUND
+    r = await client.get(f"/api/heroes/{uuid.uuid4()}/missions")
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_detail_previews(session: AsyncSession, client: AsyncClient) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    heroes = [Hero(name=f"Hero {i}", secret_name="Secret", team=team) for i in range(4)]
+    missions = [Mission(description=f"Mission {i}") for i in range(3)]
+    session.add_all([team, *heroes, *missions])
+    session.add_all(
+        [HeroMissionLink(hero_id=hero.id, mission_id=missions[0].id) for hero in heroes]
+        + [
+            HeroMissionLink(hero_id=heroes[0].id, mission_id=mission.id)
+            for mission in missions[1:]
+        ]
+    )
+    await session.commit()
+
+    r = await client.get(f"/api/teams/{team.id}", params={"preview": 2})
+    assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    assert body["name"] == "Preventers"
+    assert [hero["name"] for hero in body["heroes"]] == ["Hero 0", "Hero 1"]
+    assert body["hero_count"] == 4
+
+    r = await client.get(f"/api/missions/{missions[0].id}", params={"preview": 1})
+    body = r.json()
+    assert len(body["heroes"]) == 1
+    assert body["hero_count"] == 4
+
+    r = await client.get(f"/api/heroes/{heroes[0].id}", params={"preview": 1})
+    body = r.json()
+    assert body["team"]["id"] == str(team.id)
+    assert [mission["id"] for mission in body["missions"]] == [
+        min(str(mission.id) for mission in missions)
+    ]
+    assert body["mission_count"] == 3
+
+    r = await client.get(f"/api/teams/{uuid.uuid4()}", params={"preview": 2})
+    assert r.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_collection_pages_use_indexes(
+    session: AsyncSession, client: AsyncClient
+) -> None:
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(
+        _conn: object, _cursor: object, statement: str, parameters: Any, *_args: object
+    ) -> None:
+        executed.append((statement, parameters))
+
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson", team=team)
+    mission = Mission(description="Save the cat")
+    session.add_all([team, hero, mission])
+    session.add(HeroMissionLink(hero_id=hero.id, mission_id=mission.id))
+    await session.commit()
+
+    connection = await session.connection()
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for path in [
+            f"/api/teams/{team.id}/heroes",
+            f"/api/missions/{mission.id}/heroes",
+            f"/api/heroes/{hero.id}/missions",
+        ]:
+            executed.clear()
+            r = await client.get(path, params={"limit": 1})
+            assert r.status_code == status.HTTP_200_OK
+            [(statement, parameters)] = executed
+            plan = await connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            details = [row.detail for row in plan]
+            # Pages are read in index order, stopping at the limit
+            assert not any(detail.startswith("SCAN") for detail in details), path
+            assert not any("TEMP B-TREE" in detail for detail in details), path
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,169 @@
+from typing import Any
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlmodel import delete, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, Mission, Team
+
+
+@pytest.mark.asyncio
+async def test_search(session: AsyncSession, client: AsyncClient) -> None:
+    team = Team(name="Preventers", headquarters="Sharp Tower")
+    deadpond = Hero(name="Deadpond", secret_name="Dive Wilson", team=team)
+    rusty = Hero(name="Rusty-Man", secret_name="Tommy Sharp")
+    mission = Mission(description="Stop the Deadpond clones")
+    session.add_all([team, deadpond, rusty, mission])
+    await session.commit()
+
+    r = await client.get("/api/search/", params={"q": "deadpond"})
+    assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    # A match in the title outranks one in the body, and shorter titles rank higher
+    assert [(result["entity"], result["id"]) for result in body] == [
+        ("hero", str(deadpond.id)),
+        ("mission", str(mission.id)),
+    ]
+    assert body[0]["title"] == "Deadpond"
+    assert body[0]["rank"] < body[1]["rank"]
+
+    # Every term has to match
+    r = await client.get("/api/search/", params={"q": "sharp"})
+    assert {result["id"] for result in r.json()} == {str(team.id), str(rusty.id)}
+    r = await client.get("/api/search/", params={"q": "tommy sharp"})
+    assert [result["id"] for result in r.json()] == [str(rusty.id)]
+
+    r = await client.get("/api/search/", params={"q": "sharp", "entity": "team"})
+    assert [result["id"] for result in r.json()] == [str(team.id)]
+
+    r = await client.get("/api/search/", params={"q": "sharp", "limit": 1})
+    first = r.json()
+    r = await client.get("/api/search/", params={"q": "sharp", "offset": 1})
+    second = r.json()
+    assert len(first) == len(second) == 1
+    assert first[0]["id"] != second[0]["id"]
+
+    # FTS5 syntax is taken literally
+    for q in ['"', "NEAR(", "dead AND", "-", " "]:
+        r = await client.get("/api/search/", params={"q": q})
+        assert r.status_code == status.HTTP_200_OK, q
+
+    r = await client.get("/api/search/", params={"q": ""})
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_search_follows_writes(
+    session: AsyncSession, client: AsyncClient
+) -> None:
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    await session.commit()
+
+    r = await client.patch(f"/api/heroes/{hero.id}", json={"name": "Spider-Boy"})
+    assert r.status_code == status.HTTP_200_OK
+    r = await client.get("/api/search/", params={"q": "deadpond"})
+    assert r.json() == []
+    r = await client.get("/api/search/", params={"q": "spider"})
+    assert [result["title"] for result in r.json()] == ["Spider-Boy"]
+
+    # Bulk statements go through the same triggers
+    await session.exec(update(Hero).values(secret_name="Pedro Parqueador"))
+    await session.commit()
+    r = await client.get("/api/search/", params={"q": "pedro"})
+    assert [result["id"] for result in r.json()] == [str(hero.id)]
+
+    await session.exec(delete(Hero))
+    await session.commit()
+    r = await client.get("/api/search/", params={"q": "spider"})
+    assert r.json() == []
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_every_match(
+    session: AsyncSession, client: AsyncClient
+) -> None:
+    # The best match is the oldest
+    deadpond = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(deadpond)
+    session.add(Mission(description="Stop Deadpond"))
+    await session.commit()
+    session.add_all(
+        Hero(name=f"Deadpond Clone {i}", secret_name="Deadpond") for i in range(30)
+    )
+    session.add_all(
+        Team(name=f"Deadpond Fan Club {i}", headquarters="Deadpond Tower")
+        for i in range(30)
+    )
+    await session.commit()
+
+    r = await client.get("/api/search/", params={"q": "deadpond", "limit": 100})
+    ranking = r.json()
+    assert len(ranking) == 62
+    assert ranking[0]["id"] == str(deadpond.id)
+    assert [result["rank"] for result in ranking] == sorted(
+        result["rank"] for result in ranking
+    )
+
+    # Pages are slices of the same ranking, down to the last match
+    pages = []
+    for offset in range(0, 70, 7):
+        r = await client.get(
+            "/api/search/", params={"q": "deadpond", "offset": offset, "limit": 7}
+        )
+        pages.extend(r.json())
+    assert pages == ranking
+
+
+@pytest.mark.asyncio
+async def test_search_plan(session: AsyncSession, client: AsyncClient) -> None:
+    executed: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(
+        _conn: object, _cursor: object, statement: str, parameters: Any, *_args: object
+    ) -> None:
+        executed.append((statement, parameters))
+
+    session.add(Hero(name="Deadpond", secret_name="Dive Wilson"))
+    await session.commit()
+
+    connection = await session.connection()
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for params in [{"q": "dead"}, {"q": "dead", "entity": "hero"}]:
+            executed.clear()
+            r = await client.get("/api/search/", params=params)
+            assert r.status_code == status.HTTP_200_OK
+            [(statement, parameters)] = executed
+            plan = await connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            details = [row.detail for row in plan]
+            # Matches only come out of the FTS5 indexes, each entity's best
+            # through its own subquery, and documents are looked up by rowid
+            assert not any(
+                detail.startswith("SCAN")
+                and "VIRTUAL TABLE" not in detail
+                and not detail.startswith("SCAN anon_")
+                for detail in details
+            ), details
+            assert any(
+                "searchdocument USING INTEGER PRIMARY KEY" in detail
+                for detail in details
+            ), details
+            scanned = {
+                detail.split()[1]
+                for detail in details
+                if detail.startswith("SCAN searchindex_")
+            }
+            assert scanned == (
+                {"searchindex_hero"}
+                if "entity" in params
+                else {"searchindex_hero", "searchindex_team", "searchindex_mission"}
+            ), details
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,36 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import config
+from app.models import Hero, Team
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/heroes/", "/api/teams/"])
+async def test_fast_responses_match_response_model(
+    session: AsyncSession,
+    client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    path: str,
+) -> None:
+    team = Team(name="Préventers", headquarters="Sharp Tower")
+    session.add(team)
+    session.add_all(
+        [
+            Hero(name="Deadpond", secret_name="Dive Wilson", team_id=team.id),
+            Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48),
+            Team(name="Z-Force", headquarters="Sister Margaret's Bar"),
+        ]
+    )
+    await session.commit()
+
+    r = await client.get(path, params={"limit": 1})
+    assert r.status_code == status.HTTP_200_OK
+    monkeypatch.setattr(config, "fast_responses", True)
+    fast = await client.get(path, params={"limit": 1})
+    assert fast.status_code == status.HTTP_200_OK
+    assert fast.content == r.content
+    assert fast.headers["content-type"] == r.headers["content-type"]
+    assert fast.headers["X-Next-Cursor"] == r.headers["X-Next-Cursor"]
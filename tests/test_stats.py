@@ -0,0 +1,69 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Hero, HeroMissionLink, Mission, Team
+
+
+@pytest.mark.asyncio
+async def test_team_stats(
+    session: AsyncSession, client: AsyncClient, statements: list[str]
+) -> None:
+    avengers = Team(name="Avengers", headquarters="Tower")
+    empty = Team(name="Defenders", headquarters="Hell's Kitchen")
+    session.add_all([avengers, empty])
+    session.add_all(
+        [
+            Hero(name="Thor", secret_name="Thor", age=30, team=avengers),
+            Hero(name="Hulk", secret_name="Bruce", age=41, team=avengers),
+            Hero(name="Wasp", secret_name="Janet", team=avengers),
+            Hero(name="Deadpond", secret_name="Dive Wilson", age=25),
+        ]
+    )
+    await session.commit()
+
+    statements.clear()
+    r = await client.get("/api/teams/stats")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json() == [
+        {"id": str(avengers.id), "name": "Avengers", "heroes": 3, "average_age": 35.5},
+        {"id": str(empty.id), "name": "Defenders", "heroes": 0, "average_age": None},
+    ]
+    assert len(statements) == 1
+
+    # Served from the stats cache until it expires
+    r = await client.get(
+        "/api/teams/stats", headers={"If-None-Match": r.headers["ETag"]}
+    )
+    assert r.status_code == status.HTTP_304_NOT_MODIFIED
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_mission_stats(session: AsyncSession, client: AsyncClient) -> None:
+    heroes = [Hero(name=f"Hero {i}", secret_name="Secret") for i in range(3)]
+    active = Mission(description="Save the world")
+    done = Mission(description="Saved the cat", active=False)
+    idle = Mission(description="Someday")
+    session.add_all([*heroes, active, done, idle])
+    await session.commit()
+    session.add_all(
+        [
+            HeroMissionLink(hero_id=heroes[0].id, mission_id=active.id),
+            HeroMissionLink(hero_id=heroes[1].id, mission_id=active.id),
+            HeroMissionLink(hero_id=heroes[1].id, mission_id=done.id),
+            HeroMissionLink(hero_id=heroes[2].id, mission_id=done.id),
+        ]
+    )
+    await session.commit()
+
+    r = await client.get("/api/missions/stats")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json() == {
+        "missions": 3,
+        "active_missions": 2,
+        "assignments": 4,
+        "active_assignments": 2,
+        "heroes_on_active_missions": 2,
+    }